@@ -0,0 +1,111 @@
+"""
+Benchmarks for command latency and throughput of the library.
+
+Every case runs one operation of the KELSerial API repeatedly and reports operations per second, latency
+percentiles and how much of the time was spent waiting on the transport. Run against the simulator by default
+or against real hardware, see ``python -m benchmarks --help``.
+"""
+
+from time import perf_counter
+import platform
+
+try:
+    from kelctl import *
+    from kelctl import SimulatedKEL103
+except ImportError:
+    from src.kelctl import *  # For use with this repo and folder structure
+    from src.kelctl import SimulatedKEL103
+
+
+def _setup_list(load):
+    steps = [ListStep(1 + (i % 5), 0.01, 1) for i in range(84)]
+    load.set_list(LoadList(1, 10, steps, 3), recall=False)
+    load.recall_list(1)
+
+
+def _setup_dynamic(load):
+    load.set_dynamic_mode(CCList(0.1, 0.1, 1, 2, 1, 50))
+
+
+def _get_list(load, i):
+    # read from the device instead of the slot cache
+    load.invalidate_slots()
+    return load.get_list(1)
+
+
+def _setpoint(load, i):
+    load.current = 0.1 + (i % 10) * 0.01
+
+
+# name -> (setup, operation)
+CASES = {
+    "setpoint": (None, _setpoint),
+    "measured_voltage": (None, lambda load, i: load.measured_voltage),
+    "status": (None, lambda load, i: load.status),
+    "get_list_84": (_setup_list, _get_list),
+    "get_list_84_cached": (_setup_list, lambda load, i: load.get_list(1)),
+    "get_dynamic_mode": (_setup_dynamic, lambda load, i: load.get_dynamic_mode()),
+    "device_info": (None, lambda load, i: load.device_info),
+}
+
+
+def percentile(values, fraction):
+    """ Nearest rank percentile of sorted values. """
+    if not values:
+        return None
+    index = min(int(round(fraction * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def run_case(load, name, iterations=100):
+    """ Run a single case and return its results as dict. """
+    setup, operation = CASES[name]
+    if setup is not None:
+        setup(load)
+
+    timings = load.stats.commands
+    io_before = sum(t.total for t in timings.values())
+    latencies = []
+    start = perf_counter()
+    for i in range(iterations):
+        begin = perf_counter()
+        operation(load, i)
+        latencies.append(perf_counter() - begin)
+    total = perf_counter() - start
+    io_time = sum(t.total for t in timings.values()) - io_before
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "total": total,
+        "ops_per_s": iterations / total if total else None,
+        "mean": total / iterations,
+        "p50": percentile(latencies, 0.5),
+        "p90": percentile(latencies, 0.9),
+        "p99": percentile(latencies, 0.99),
+        "max": latencies[-1],
+        # time spent from writing a command until its response arrived, the rest is pacing and library overhead
+        "io_fraction": io_time / total if total else None,
+    }
+
+
+def run(load, iterations=100, cases=None):
+    """ Run the given cases, all by default, and return the results as dict ready to be stored as JSON. """
+    results = {
+        "python": platform.python_version(),
+        "gap": load.pacer.gap,
+        "cases": {},
+    }
+    for name in cases or CASES:
+        results["cases"][name] = run_case(load, name, iterations)
+    return results
+
+
+def compare(results, baseline):
+    """ Return dict of case name to ratio of ops_per_s against a baseline result, above 1 is faster. """
+    ratios = {}
+    for name, case in results["cases"].items():
+        old = baseline.get("cases", {}).get(name)
+        if old and old.get("ops_per_s") and case.get("ops_per_s"):
+            ratios[name] = case["ops_per_s"] / old["ops_per_s"]
+    return ratios
@@ -0,0 +1,56 @@
+"""
+Command line interface for the benchmarks.
+
+python -m benchmarks                                  # against the simulator
+python -m benchmarks --port /dev/ttyACM0 --output results.json
+python -m benchmarks --compare results.json           # ratios against an earlier run
+"""
+
+import argparse
+import json
+
+from . import *
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark KELSerial command latency and throughput")
+    parser.add_argument("--port", help="serial device or udp:// url of a real load, runs against the simulator if omitted")
+    parser.add_argument("--rate", type=int, default=115200, help="baud rate")
+    parser.add_argument("--latency", type=float, default=0.001, help="response latency of the simulator in seconds")
+    parser.add_argument("--gap", type=float, default=0.1, help="minimum gap after writes in seconds")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--case", action="append", choices=list(CASES), help="run only this case, can be repeated")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    if args.port:
+        port = args.port
+        target = args.port
+    else:
+        port = SimulatedKEL103(latency=args.latency, rate=args.rate)
+        target = "simulator"
+
+    with KELSerial(port, BaudRate(args.rate), send_sleep_time=args.gap) as load:
+        results = run(load, args.iterations, args.case)
+    results["target"] = target
+
+    print("{0:<20}{1:>10}{2:>10}{3:>10}{4:>10}{5:>8}".format("case", "ops/s", "p50 ms", "p90 ms", "p99 ms", "io %"))
+    for name, case in results["cases"].items():
+        print("{0:<20}{1:>10.1f}{2:>10.2f}{3:>10.2f}{4:>10.2f}{5:>8.1f}".format(
+            name, case["ops_per_s"], case["p50"] * 1000, case["p90"] * 1000, case["p99"] * 1000,
+            case["io_fraction"] * 100))
+
+    if args.compare:
+        with open(args.compare) as f:
+            ratios = compare(results, json.load(f))
+        for name, ratio in ratios.items():
+            print("{0:<20}{1:>9.2f}x".format(name, ratio))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,3 +2,62 @@ from .kelctl import *
 from .kellists import *
 from .kelerrors import *
 from .kelenums import *
+from .keldecode import *
+from .kelstream import *
+
+# names of modules with heavier imports (asyncio, socket, numpy, thread pools), loaded on first access
+_lazy_names = {
+    "DEFAULT_PORT": "keltransport",
+    "DEFAULT_LOCAL_PORT": "keltransport",
+    "UDPTransport": "keltransport",
+    "SENT": "keltransport",
+    "RECEIVED": "keltransport",
+    "LOG_HEADER": "keltransport",
+    "read_traffic_log": "keltransport",
+    "RecordingTransport": "keltransport",
+    "ReplayTransport": "keltransport",
+    "COLUMNS": "kelbuffer",
+    "Statistics": "kelbuffer",
+    "BufferSummary": "kelbuffer",
+    "MeasurementBuffer": "kelbuffer",
+    "BatterySample": "kelbattery",
+    "BatteryMonitor": "kelbattery",
+    "CUTOFF_VOLTAGE": "kelbattery",
+    "CUTOFF_CAPACITY": "kelbattery",
+    "CUTOFF_TIME": "kelbattery",
+    "CUTOFF_INPUT": "kelbattery",
+    "CUTOFF_STOPPED": "kelbattery",
+    "profile_modes": "kelprofile",
+    "ProfileStep": "kelprofile",
+    "StepTiming": "kelprofile",
+    "ProfileReport": "kelprofile",
+    "ProfilePlayer": "kelprofile",
+    "AsyncKELSerial": "kelasync",
+    "SimulatedKEL103": "kelsim",
+    "PoolResults": "kelpool",
+    "KELPool": "kelpool",
+    "slot_sections": "kelconfig",
+    "load_config": "kelconfig",
+    "slot_object": "kelconfig",
+    "slot_fields": "kelconfig",
+    "check_config": "kelconfig",
+    "read_config": "kelconfig",
+    "diff_config": "kelconfig",
+    "apply_config": "kelconfig",
+}
+
+# star imports still get every name, import names directly to skip loading the heavier modules
+__all__ = [name for name in globals() if not name.startswith("_")] + list(_lazy_names)
+
+
+def __getattr__(name):
+    if name not in _lazy_names:
+        raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
+    import importlib
+    value = getattr(importlib.import_module("." + _lazy_names[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_names))
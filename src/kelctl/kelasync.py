@@ -0,0 +1,590 @@
+"""
+Asyncio communication with Korad KEL103 and potentially KEL102 electronic loads.
+
+AsyncKELSerial mirrors the KELSerial API with awaitable methods, so a single event loop can drive many loads
+and other instruments at once. Properties of KELSerial become coroutine methods, setters get a ``set_`` prefix:
+
+import asyncio
+from kelctl import AsyncKELSerial
+
+async def main():
+    async with await AsyncKELSerial.connect('/dev/ttyACM0') as load:
+        await load.set_current(1.5)
+        print("Voltage: ", await load.measured_voltage())
+
+asyncio.run(main())
+
+Opening a serial port requires the pyserial-asyncio package, any other transport can be used by passing an
+asyncio StreamReader/StreamWriter pair to the constructor.
+"""
+
+import asyncio
+import functools
+import ipaddress
+import re
+from contextlib import asynccontextmanager
+from time import monotonic
+from .kelctl import *
+
+
+def atomic(method):
+    """ Run a load operation made of several commands in one go, other coroutines can not interleave. """
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        async with self._AsyncKELSerial__serial.locked():
+            return await method(self, *args, **kwargs)
+    return wrapper
+
+
+class AsyncKELSerial(object):
+    """
+    Asyncio wrapper for communicating with a KEL103(and possibly KEL102)
+    electronic load.
+    """
+
+    class Memory(object):
+        """ Wrap a memory setting. """
+
+        def __init__(self, serial_, memory_number):
+            super(AsyncKELSerial
+                  .Memory, self).__init__()
+            self.__serial = serial_
+            self.number = memory_number
+
+        async def recall(self):
+            """ Recall this memory's settings.  """
+            await self.__serial.send("*RCL {0}".format(self.number))
+
+        async def save(self):
+            """ Save the current value to this memory. """
+            await self.__serial.send("*SAV {0}".format(self.number))
+
+    class OnOffButton(object):
+        """ Wrap an on/off button. """
+
+        def __init__(self, serial_, on_command, off_command, get_command):
+            super(AsyncKELSerial
+                  .OnOffButton, self).__init__()
+            self.__serial = serial_
+            self._on = on_command
+            self._off = off_command
+            self._get = get_command
+
+        async def on(self):
+            await self.__serial.send(self._on)
+
+        async def off(self):
+            await self.__serial.send(self._off)
+
+        async def get(self):
+            return on_off_setting_or_none(await self.__serial.send_receive(self._get))
+
+    class Serial(object):
+        """ Non-blocking serial operations on top of an asyncio stream pair.
+
+        Commands are serialized with a lock, so concurrent coroutines can share one load. The lock is held by a task,
+        so commands sent within locked() by the same task do not wait for it again.
+        """
+
+        def __init__(self, reader, writer, debug=False, send_sleep_time=0.1, adaptive_pacing=False, timeout=1,
+                     retries=1):
+            super(AsyncKELSerial
+                  .Serial, self).__init__()
+
+            self.reader = reader
+            self.writer = writer
+            self.debug = debug
+            self.timeout = timeout
+            self.retries = retries
+            self.stats = KELSerial.Stats()
+            self.pacer = KELSerial.Pacer(send_sleep_time, adaptive_pacing)
+            self.lock = asyncio.Lock()
+            self._owner = None
+
+        @asynccontextmanager
+        async def locked(self):
+            """ Hold the lock for the current task, nested use by the same task does not block. """
+            task = asyncio.current_task()
+            if self._owner is task:
+                yield
+                return
+            async with self.lock:
+                self._owner = task
+                try:
+                    yield
+                finally:
+                    self._owner = None
+
+        async def _wait(self):
+            remaining = self.pacer.delay()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+
+        async def read_string(self, line_number=1, last=None):
+            """ Read a string of one or more newline terminated lines.
+
+            Stops early if a line does not arrive within the timeout, or once a line starting with `last` completed
+            a multi-line response.
+
+            :return: str
+            """
+            return (await self._read(line_number, last))[0]
+
+        async def _read(self, line_number=1, last=None):
+            """ Read up to line_number lines, returning the string, number of bytes read and whether a line timed out.
+
+            Bytes that are not valid UTF-8 are replaced, such a line fails the format check of its query.
+            """
+            output = ""
+            received = 0
+            timed_out = False
+
+            for line in range(1, line_number + 1):
+                try:
+                    data = await asyncio.wait_for(self.reader.readline(), self.timeout)
+                except asyncio.TimeoutError:
+                    timed_out = True
+                    break
+                received += len(data)
+                line = data.decode(errors="replace")
+                output += line
+                if not line.endswith("\n"):
+                    # the stream ended within the line
+                    timed_out = True
+                    break
+                if last is not None and line.startswith(last):
+                    break
+
+            if self.debug:
+                print("read: {0}".format(output))
+
+            return output.strip('\n'), received, timed_out
+
+        async def write(self, text):
+            if self.debug:
+                print("_send: ", text)
+
+            data = "{0}\n".format(text).encode('ascii')
+            self.writer.write(data)
+            await self.writer.drain()
+            return len(data)
+
+        async def send(self, text):
+            async with self.locked():
+                await self._wait()
+                start = monotonic()
+                sent = await self.write(text)
+                self.pacer.written()
+                self.pacer.record(text)
+                self.stats.command(text, sent, 0, monotonic() - start)
+
+        async def send_receive(self, text, line_number=1):
+            """ Send a query and read its response, queries are sent again up to `retries` times if their response
+            timed out, was cut off or does not match the expected format of query_formats.
+
+            :return: the response, "" if there was no valid one
+            """
+            async with self.locked():
+                attempts = self.retries + 1 if text.endswith("?") else 1
+                for attempt in range(attempts):
+                    output, ok = await self._exchange(text, line_number)
+                    if ok:
+                        return output
+                    # a late or stale response would otherwise be read for the next query
+                    await self.resync()
+                    if output == "" and text in unanswered_queries:
+                        break
+            return "" if output and not response_matches(text, output) else output
+
+        async def _exchange(self, text, line_number):
+            """ Single query and response, returns the response and whether it arrived complete and in sync. """
+            await self._wait()
+            start = monotonic()
+            sent = await self.write(text)
+            written = monotonic()
+            output, received, timeout = await self._read(line_number, response_last_lines.get(text))
+            self.pacer.answered()
+            end = monotonic()
+            in_sync = response_matches(text, output)
+            self.pacer.record(text, output != "" and in_sync)
+            self.stats.command(text, sent, received, written - start, end - written, timeout)
+            # an empty line is a malformed response, nothing at all a timeout
+            if not in_sync and (output != "" or not timeout):
+                self.stats.parse_failed(text, output)
+
+            return output, not timeout and in_sync
+
+        async def resync(self):
+            """ Drop everything received but not read yet. """
+            while True:
+                try:
+                    # buffered data is returned at once, waiting ends as soon as nothing more arrives
+                    if not await asyncio.wait_for(self.reader.read(4096), 0.001):
+                        break
+                except asyncio.TimeoutError:
+                    break
+            self.stats.resyncs += 1
+
+        async def close(self):
+            self.writer.close()
+            await self.writer.wait_closed()
+
+    def __init__(self, reader, writer, debug=False, send_sleep_time=0.1, adaptive_pacing=False, timeout=1,
+                 retries=1):
+        """ Initialize from an already connected asyncio stream pair, see connect() for opening a serial port. """
+        super(AsyncKELSerial, self).__init__()
+
+        self.__serial = AsyncKELSerial.Serial(reader, writer, debug, send_sleep_time, adaptive_pacing, timeout,
+                                              retries)
+
+        # Memory recall/save buttons 1 through 100 -> mapped to memories 0 to 99
+        self.memories = KELSerial.Memories(AsyncKELSerial.Memory, self.__serial)
+
+        self.input = AsyncKELSerial.OnOffButton(self.__serial, ":INP ON", ":INP OFF", ":INP?")
+        self.settings = AsyncKELSerial.Settings(self.__serial)
+
+    @classmethod
+    async def connect(cls, port, rate: BaudRate = BaudRate(115200), debug=False, send_sleep_time=0.1,
+                      adaptive_pacing=False, timeout=1, retries=1):
+        """ Open a serial port and return a connected AsyncKELSerial. Requires the pyserial-asyncio package. """
+        try:
+            import serial_asyncio
+        except ImportError as e:
+            raise ImportError("pyserial-asyncio is required for opening serial ports asynchronously") from e
+
+        reader, writer = await serial_asyncio.open_serial_connection(url=port, baudrate=rate.b)
+        return cls(reader, writer, debug, send_sleep_time, adaptive_pacing, timeout, retries)
+
+    class Settings(object):
+        def __init__(self, serial_):
+            super(AsyncKELSerial
+                  .Settings, self).__init__()
+            self.__serial = serial_
+
+            self.beep = AsyncKELSerial.OnOffButton(self.__serial, ":SYST:BEEP ON", ":SYST:BEEP OFF", ":SYST:BEEP?")
+            self.lock = AsyncKELSerial.OnOffButton(self.__serial, ":SYST:LOCK ON", ":SYST:LOCK OFF", ":SYST:LOCK?")
+            self.dhcp = AsyncKELSerial.OnOffButton(self.__serial, ":SYST:DHCP 1", ":SYST:DHCP 0", ":SYST:DHCP?")
+            self.trigger = AsyncKELSerial.OnOffButton(self.__serial, ":SYST:EXIT ON", ":SYST:EXIT OFF", ":SYST:EXIT?")
+            self.compensation = AsyncKELSerial.OnOffButton(self.__serial, ":SYST:COMP ON", ":SYST:COMP OFF", ":SYST:COMP?")
+
+            # Same limit cache as KELSerial.Settings
+            self.trust_cache = False
+            self._limits = {}
+
+        async def _read_limit(self, name):
+            command, unit = KELSerial.Settings._limit_commands[name]
+            value = float_or_none((await self.__serial.send_receive(command + "?")).rstrip(unit))
+            if value is None:
+                self._limits.pop(name, None)
+            else:
+                self._limits[name] = value
+            return value
+
+        async def _write_limit(self, name, value):
+            command, unit = KELSerial.Settings._limit_commands[name]
+            await self.__serial.send("{0} {1:5.4f}{2}".format(command, value, unit))
+            self._limits[name] = float(value)
+
+        async def _get_limit(self, name):
+            if self.trust_cache:
+                return await self.cached_limit(name)
+            return await self._read_limit(name)
+
+        async def cached_limit(self, name):
+            if name in self._limits:
+                return self._limits[name]
+            return await self._read_limit(name)
+
+        def invalidate_limits(self):
+            self._limits.clear()
+
+        async def refresh_limits(self):
+            return {name: await self._read_limit(name) for name in KELSerial.Settings._limit_commands}
+
+        async def current_limit(self):
+            return await self._get_limit("current")
+
+        async def set_current_limit(self, value):
+            await self._write_limit("current", value)
+
+        async def voltage_limit(self):
+            return await self._get_limit("voltage")
+
+        async def set_voltage_limit(self, value):
+            await self._write_limit("voltage", value)
+
+        async def resistance_limit(self):
+            return await self._get_limit("resistance")
+
+        async def set_resistance_limit(self, value):
+            await self._write_limit("resistance", value)
+
+        async def power_limit(self):
+            return await self._get_limit("power")
+
+        async def set_power_limit(self, value):
+            await self._write_limit("power", value)
+
+        async def factoryreset(self):
+            await self.__serial.send(":SYST:FACTRESET")
+            self.invalidate_limits()
+
+        async def baudrate(self):
+            result = await self.__serial.send_receive(":SYST:BAUD?")
+            return baudrate_lookup.get(result) or BaudRate(int(result))
+
+        async def set_baudrate(self, rate: BaudRate):
+            await self.__serial.send(":SYST:BAUD {0}".format(rate.b))
+
+        async def subnetmask(self):
+            return str(await self.__serial.send_receive(":SYST:SMASK?"))
+
+        async def set_subnetmask(self, value: str):
+            ip = ipaddress.ip_address(value)
+            await self.__serial.send(":SYST:SMASK {0}".format(ip))
+
+        async def ipaddress(self):
+            return str(await self.__serial.send_receive(":SYST:IPAD?"))
+
+        async def set_ipaddress(self, value: str):
+            ip = ipaddress.ip_address(value)
+            await self.__serial.send(":SYST:IPAD {0}".format(ip))
+
+        async def gateway(self):
+            return str(await self.__serial.send_receive(":SYST:GATE?"))
+
+        async def set_gateway(self, value: str):
+            ip = ipaddress.ip_address(value)
+            await self.__serial.send(":SYST:GATE {0}".format(ip))
+
+        async def macaddress(self):
+            return str(await self.__serial.send_receive(":SYST:MAC?"))
+
+        async def set_macaddress(self, value: str):
+            """ verifying proper mac address """
+            if re.match("[0-9a-f]{2}([-:]?)[0-9a-f]{2}(\\1[0-9a-f]{2}){4}$", value.lower()):
+                await self.__serial.send(":SYST:MAC {0}".format(value.replace(":", "-")))
+            else:
+                raise ValueError
+
+        async def port(self):
+            return int(await self.__serial.send_receive(":SYST:PORT?"))
+
+        async def set_port(self, value: int):
+            await self.__serial.send(":SYST:PORT {0}".format(value))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, _type, value, traceback):
+        await self.close()
+        return False
+
+    # ##################################################################
+    # Connection operations
+    # ##################################################################
+
+    @property
+    def is_open(self):
+        return not self.__serial.writer.is_closing()
+
+    @property
+    def pacer(self):
+        return self.__serial.pacer
+
+    @property
+    def stats(self):
+        return self.__serial.stats
+
+    @property
+    def retries(self):
+        """ How often a query is sent again after its response timed out, was cut off or was out of sync. """
+        return self.__serial.retries
+
+    @retries.setter
+    def retries(self, value):
+        self.__serial.retries = value
+
+    async def close(self):
+        """ Close the connection """
+        await self.__serial.close()
+
+    # ##################################################################
+    # Load operations
+    # ##################################################################
+
+    async def trigger(self):
+        """Simulate an external trigger, used for Pulse and trigger dynamic mode"""
+        await self.__serial.send("*TRG")
+
+    @atomic
+    async def set_list(self, load_list: LoadList, recall=True):
+        # lists are not chained across slots here, see KELSerial.ListChain
+        load_list.validate(chained=False)
+        await self.__serial.send(load_list.__str__())
+
+        if recall:
+            await self.recall_list(load_list.save_slot)
+
+    async def recall_list(self, list_number: int):
+        if 1 > list_number or list_number > 7:
+            raise ValueError("save-slot can only be from 1-7")
+
+        await self.__serial.send(":RCL:LIST " + str(list_number))
+
+    @atomic
+    async def get_list(self, list_number: int):
+        await self.recall_list(list_number)
+        return parse_list(list_number, await self.__serial.send_receive(":RCL:LIST?"))
+
+    @atomic
+    async def set_ocp(self, ocp_list: OCPList, recall=True):
+        ocp_list.validate()
+        await self.__serial.send(ocp_list.__str__())
+
+        if recall:
+            await self.recall_ocp(ocp_list.save_slot)
+
+    async def recall_ocp(self, list_number: int):
+        if 1 > list_number or list_number > 10:
+            raise ValueError("save-slot can only be from 1-10")
+
+        await self.__serial.send(":RCL:OCP " + str(list_number))
+
+    @atomic
+    async def get_ocp(self, list_number: int):
+        await self.recall_ocp(list_number)
+        return parse_ocp(list_number, await self.__serial.send_receive(":RCL:OCP?"))
+
+    @atomic
+    async def set_opp(self, opp_list: OPPList, recall=True):
+        opp_list.validate()
+        await self.__serial.send(opp_list.__str__())
+
+        if recall:
+            await self.recall_opp(opp_list.save_slot)
+
+    async def recall_opp(self, list_number: int):
+        if 1 > list_number or list_number > 10:
+            raise ValueError("save-slot can only be from 1-10")
+
+        await self.__serial.send(":RCL:OPP " + str(list_number))
+
+    @atomic
+    async def get_opp(self, list_number: int):
+        await self.recall_opp(list_number)
+        return parse_opp(list_number, await self.__serial.send_receive(":RCL:OPP?"))
+
+    @atomic
+    async def set_batt(self, batt_list: BattList, recall=True):
+        batt_list.validate()
+        await self.__serial.send(batt_list.__str__())
+
+        if recall:
+            await self.recall_batt(batt_list.save_slot)
+
+    async def recall_batt(self, list_number: int):
+        if 1 > list_number or list_number > 10:
+            raise ValueError("save-slot can only be from 1-10")
+
+        await self.__serial.send(":RCL:BATT " + str(list_number))
+
+    @atomic
+    async def get_batt(self, list_number: int):
+        await self.recall_batt(list_number)
+        return parse_batt(list_number, await self.__serial.send_receive(":RCL:BATT?"))
+
+    async def get_batt_time(self):
+        return float_or_none((await self.__serial.send_receive(":BATT:TIM?")).replace("M", ""))
+
+    async def get_batt_cap(self):
+        return float_or_none((await self.__serial.send_receive(":BATT:CAP?")).replace("AH", ""))
+
+    @atomic
+    async def get_dynamic_mode(self):
+        function = await self.function()
+        if function not in dynamic_limits:
+            raise InvalidModeError(function)
+
+        return parse_dynamic_mode(await self.__serial.send_receive(":DYN?"))
+
+    async def recall_dynamic_mode(self):
+        return await self.__serial.send_receive(":DYN?")
+
+    @atomic
+    async def set_dynamic_mode(self, dynamic_list, recall=True):
+        if dynamic_list.function not in dynamic_limits:
+            raise ValueError()
+
+        dynamic_list.validate(await self.settings.cached_limit(dynamic_limits[dynamic_list.function]))
+
+        await self.__serial.send(dynamic_list.__str__())
+
+        if recall:
+            await self.recall_dynamic_mode()
+
+    async def device_info(self):
+        return await self.__serial.send_receive(":SYST:DEVINFO?", 7)
+
+    async def model(self):
+        return await self.__serial.send_receive("*IDN?")
+
+    async def status(self):
+        status = await self.__serial.send_receive(":STAT?")
+        if len(status) == 0:
+            return None
+        else:
+            return Status(status)
+
+    async def function(self):
+        result = await self.__serial.send_receive(":FUNC?")
+        if len(result) == 0:
+            return None
+        else:
+            return mode_lookup.get(result) or Mode(result)
+
+    async def set_function(self, mode: Mode):
+        if mode in settableModes:
+            await self.__serial.send(":FUNC {0}".format(mode.value))
+        else:
+            raise NoModeSetError(mode)
+
+    async def _set_value(self, name, command, value):
+        limit = await self.settings.cached_limit(name)
+        if value <= limit:
+            await self.__serial.send(command.format(value))
+        else:
+            raise ValueOutOfLimitError(value, limit)
+
+    async def current(self):
+        return float_or_none((await self.__serial.send_receive(":CURR?")).rstrip("A"))
+
+    async def set_current(self, value):
+        await self._set_value("current", ":CURR {0:5.4f}A", value)
+
+    async def voltage(self):
+        return float_or_none((await self.__serial.send_receive(":VOLT?")).rstrip("V"))
+
+    async def set_voltage(self, value):
+        await self._set_value("voltage", ":VOLT {0:5.4f}V", value)
+
+    async def resistance(self):
+        return float_or_none((await self.__serial.send_receive(":RES?")).rstrip("OHM"))
+
+    async def set_resistance(self, value):
+        await self._set_value("resistance", ":RES {0:5.4f}OHM", value)
+
+    async def power(self):
+        return float_or_none((await self.__serial.send_receive(":POW?")).rstrip("W"))
+
+    async def set_power(self, value):
+        await self._set_value("power", ":POW {0:5.4f}W", value)
+
+    async def measured_current(self):
+        return float_or_none((await self.__serial.send_receive(":MEAS:CURR?")).rstrip("A"))
+
+    async def measured_voltage(self):
+        return float_or_none((await self.__serial.send_receive(":MEAS:VOLT?")).rstrip("V"))
+
+    async def measured_power(self):
+        return float_or_none((await self.__serial.send_receive(":MEAS:POW?")).rstrip("W"))
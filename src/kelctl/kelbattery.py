@@ -0,0 +1,199 @@
+"""
+Host side monitoring of battery discharge tests.
+
+BatteryMonitor uploads a BattList, starts the discharge and polls capacity, test time, voltage and current as one
+batch of queries at a set rate. Charge and energy are integrated on the host as a cross-check of the capacity
+the load reports, and the cutoff conditions of the BattList are checked on every sample. Samples can be appended
+to a checkpoint file, a monitor created with the same file resumes the test after a restart:
+
+from kelctl import BatteryMonitor, BattList
+
+monitor = BatteryMonitor(load, BattList(1, 10, 2, 3.0, 2.5, 600), rate=1, checkpoint='cell17.jsonl')
+monitor.start()
+for sample in monitor.run():
+    print(sample.capacity, sample.charge, sample.voltage)
+print("Stopped by: ", monitor.cutoff)
+"""
+
+from collections import namedtuple
+from time import monotonic, sleep, time
+import json
+import os
+from .kelenums import *
+from .kellists import *
+
+BatterySample = namedtuple("BatterySample", ["timestamp", "minutes", "capacity", "voltage", "current",
+                                             "charge", "energy"])
+BatterySample.__doc__ = """ A single sample of a battery test.
+
+timestamp is the time.time() value taken before querying, minutes and capacity (Ah) are reported by the load,
+charge (Ah) and energy (Wh) are integrated on the host.
+"""
+
+# cutoff reasons
+CUTOFF_VOLTAGE = "voltage"
+CUTOFF_CAPACITY = "capacity"
+CUTOFF_TIME = "time"
+CUTOFF_INPUT = "input"  # the load turned its input off, i.e. it detected the cutoff itself
+CUTOFF_STOPPED = "stopped"  # stopped by calling stop()
+
+_batt_queries = (":BATT:CAP?", ":BATT:TIM?", ":MEAS:VOLT?", ":MEAS:CURR?", ":INP?")
+
+
+class BatteryMonitor(object):
+    """
+    Runs and monitors a battery test defined by a BattList.
+
+    The load must not be used from another thread while the monitor is running.
+    """
+
+    def __init__(self, load, batt_list: BattList, rate=1.0, checkpoint=None, stop_on_cutoff=True):
+        """ Initialize monitor, resumes from the checkpoint file if it exists.
+
+        :param load: KELSerial instance running the test
+        :param batt_list: test to run, cutoff capacity and time of 0 are not checked
+        :param rate: samples per second
+        :param checkpoint: file samples are appended to as JSON lines, None to not checkpoint
+        :param stop_on_cutoff: turn the input off as soon as the host detects a cutoff
+        """
+        super(BatteryMonitor, self).__init__()
+        if rate <= 0:
+            raise ValueError("rate must be above 0")
+        batt_list.validate()
+
+        self.load = load
+        self.batt_list = batt_list
+        self.rate = rate
+        self.checkpoint = checkpoint
+        self.stop_on_cutoff = stop_on_cutoff
+        self.samples = []
+        self.charge = 0.0
+        self.energy = 0.0
+        self.cutoff = None
+        self.overruns = 0
+        self.resumed = False
+
+        if checkpoint is not None and os.path.exists(checkpoint):
+            self._restore()
+
+    def _settings(self):
+        batt_list = self.batt_list
+        return [batt_list.save_slot, batt_list.current_range, batt_list.discharge_current, batt_list.cutoff_voltage,
+                batt_list.cutoff_capacity, batt_list.cutoff_time]
+
+    def _restore(self):
+        with open(self.checkpoint, "rb+") as f:
+            data = f.read()
+            lines = data.split(b"\n")
+            for line in lines[:-1]:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "batt_list" in record:
+                    if record["batt_list"] != self._settings():
+                        raise ValueError("checkpoint {0} belongs to a different BattList".format(self.checkpoint))
+                    self.resumed = True
+                elif "cutoff" in record:
+                    self.cutoff = record["cutoff"]
+                else:
+                    sample = BatterySample(*record)
+                    self.samples.append(sample)
+                    self.charge = sample.charge
+                    self.energy = sample.energy
+            if lines[-1]:
+                # the last record was cut off while writing it, i.e. by a crash, resume from the one before
+                f.truncate(len(data) - len(lines[-1]))
+
+    def _write(self, record):
+        if self.checkpoint is None:
+            return
+        with open(self.checkpoint, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start(self):
+        """ Upload the BattList and turn the input on. Does nothing when resuming from a checkpoint. """
+        if self.resumed:
+            return
+        self.load.set_batt(self.batt_list)
+        self.load.input.on()
+        self._write({"batt_list": self._settings(), "started": time()})
+
+    def sample(self):
+        """ Take a single sample and integrate it.
+
+        :return: the sample and the input state
+        :rtype: (BatterySample, OnOffState)
+        """
+        timestamp = time()
+        capacity, minutes, voltage, current, state = self.load.query(*_batt_queries)
+
+        if self.samples and current is not None and voltage is not None:
+            previous = self.samples[-1]
+            if previous.current is not None and previous.voltage is not None:
+                hours = (timestamp - previous.timestamp) / 3600
+                self.charge += (current + previous.current) / 2 * hours
+                self.energy += (voltage * current + previous.voltage * previous.current) / 2 * hours
+
+        sample = BatterySample(timestamp, minutes, capacity, voltage, current, self.charge, self.energy)
+        self.samples.append(sample)
+        self._write(list(sample))
+        return sample, state
+
+    def check_cutoff(self, sample, state=None):
+        """ Return the reason if a cutoff condition is met by the sample, otherwise None. """
+        batt_list = self.batt_list
+        if sample.voltage is not None and sample.voltage <= batt_list.cutoff_voltage:
+            return CUTOFF_VOLTAGE
+        capacity = sample.capacity if sample.capacity is not None else sample.charge
+        if batt_list.cutoff_capacity and capacity >= batt_list.cutoff_capacity:
+            return CUTOFF_CAPACITY
+        if batt_list.cutoff_time and sample.minutes is not None and sample.minutes >= batt_list.cutoff_time:
+            return CUTOFF_TIME
+        if state is OnOffState.off:
+            return CUTOFF_INPUT
+        return None
+
+    def run(self, duration=None):
+        """ Generator yielding samples at the set rate until a cutoff is detected.
+
+        If sampling falls behind the rate the missed ticks are skipped and counted as overruns.
+
+        :param duration: stop after this many seconds even without cutoff, None runs until cutoff
+        """
+        if self.cutoff is not None:
+            return
+        interval = 1 / self.rate
+        start = monotonic()
+        next_tick = start
+
+        while duration is None or monotonic() - start < duration:
+            now = monotonic()
+            if next_tick > now:
+                sleep(next_tick - now)
+            elif now - next_tick >= interval:
+                missed = int((now - next_tick) / interval)
+                self.overruns += missed
+                next_tick += missed * interval
+            next_tick += interval
+
+            sample, state = self.sample()
+            reason = self.check_cutoff(sample, state)
+            if reason is not None:
+                # stop before handing out the sample, the consumer may take its time
+                if reason != CUTOFF_INPUT and self.stop_on_cutoff:
+                    self.load.input.off()
+                self._end(reason)
+            yield sample
+            if reason is not None:
+                return
+
+    def stop(self):
+        """ End the test before a cutoff, turning the input off. """
+        self.load.input.off()
+        self._end(CUTOFF_STOPPED)
+
+    def _end(self, reason):
+        self.cutoff = reason
+        self._write({"cutoff": reason})
@@ -0,0 +1,167 @@
+"""
+Columnar storage of measurements with statistics over time windows.
+
+MeasurementBuffer keeps timestamp, voltage, current and power in one contiguous array per column instead of a
+Python object per sample, and summarizes any time window in vectorized form. NumPy is used if it is installed,
+otherwise the columns are ``array.array`` objects and the statistics are computed in plain Python:
+
+from kelctl import MeasurementBuffer, Sampler
+
+buffer = MeasurementBuffer()
+buffer.extend(Sampler(load, rate=10).stream(duration=3600))
+summary = buffer.summary()
+print(summary.voltage.mean, summary.energy, summary.charge)
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+COLUMNS = ("timestamp", "voltage", "current", "power")
+
+Statistics = namedtuple("Statistics", ["count", "min", "max", "mean", "rms"])
+Statistics.__doc__ = """ Statistics of one column, count is the number of valid values, all others are None without any. """
+
+BufferSummary = namedtuple("BufferSummary", ["count", "duration", "voltage", "current", "power", "energy", "charge"])
+BufferSummary.__doc__ = """ Summary of a time window, energy in Wh and charge in Ah are integrated over the window. """
+
+
+class MeasurementBuffer(object):
+    """
+    Growable columnar buffer of measurements.
+
+    Samples have to be appended in order of their timestamps. Missing values (None) are stored as NaN and left
+    out of the statistics.
+    """
+
+    def __init__(self, capacity=1024, use_numpy=None):
+        """ Initialize buffer.
+
+        :param capacity: number of samples space is allocated for up front, the buffer grows as needed
+        :param use_numpy: store columns as NumPy arrays, defaults to whether NumPy is installed
+        """
+        super(MeasurementBuffer, self).__init__()
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        elif use_numpy and numpy is None:
+            raise ImportError("NumPy is not installed")
+        self.use_numpy = use_numpy
+        self._length = 0
+        if use_numpy:
+            self._data = numpy.empty((len(COLUMNS), max(capacity, 1)))
+        else:
+            self._data = [array("d") for _ in COLUMNS]
+
+    def __len__(self):
+        return self._length
+
+    def _grow(self, needed):
+        capacity = self._data.shape[1]
+        while capacity < needed:
+            capacity *= 2
+        data = numpy.empty((len(COLUMNS), capacity))
+        data[:, :self._length] = self._data[:, :self._length]
+        self._data = data
+
+    def append(self, timestamp, voltage=None, current=None, power=None):
+        """ Append one sample, takes either the four values or a Sample. """
+        if voltage is None and current is None and power is None and isinstance(timestamp, tuple):
+            timestamp, voltage, current, power = timestamp
+        values = (timestamp, voltage, current, power)
+        if self.use_numpy:
+            if self._length == self._data.shape[1]:
+                self._grow(self._length + 1)
+            self._data[:, self._length] = [math.nan if value is None else value for value in values]
+        else:
+            for column, value in zip(self._data, values):
+                column.append(math.nan if value is None else value)
+        self._length += 1
+
+    def extend(self, samples):
+        """ Append several samples, i.e. the result of Sampler.read() or a Sampler.stream(). """
+        for sample in samples:
+            self.append(*sample)
+
+    def clear(self):
+        self._length = 0
+        if not self.use_numpy:
+            self._data = [array("d") for _ in COLUMNS]
+
+    def column(self, name, start=None, end=None):
+        """ Values of a column within a time window.
+
+        :param name: one of "timestamp", "voltage", "current" or "power"
+        :param start: timestamp the window starts at, None from the first sample
+        :param end: timestamp the window ends at inclusively, None to the last sample
+        :return: NumPy array view or array.array copy
+        """
+        first, last = self._window(start, end)
+        return self._data[COLUMNS.index(name)][first:last]
+
+    def _window(self, start, end):
+        if self.use_numpy:
+            timestamps = self._data[0][:self._length]
+            first = 0 if start is None else int(numpy.searchsorted(timestamps, start, "left"))
+            last = self._length if end is None else int(numpy.searchsorted(timestamps, end, "right"))
+        else:
+            first = 0 if start is None else bisect_left(self._data[0], start)
+            last = self._length if end is None else bisect_right(self._data[0], end)
+        return first, last
+
+    def statistics(self, name, start=None, end=None):
+        """ min, max, mean and RMS of a column within a time window.
+
+        :rtype: Statistics
+        """
+        values = self.column(name, start, end)
+        if self.use_numpy:
+            values = values[~numpy.isnan(values)]
+            if not len(values):
+                return Statistics(0, None, None, None, None)
+            return Statistics(len(values), float(values.min()), float(values.max()), float(values.mean()),
+                              float(numpy.sqrt(numpy.mean(values * values))))
+
+        values = [value for value in values if not math.isnan(value)]
+        if not values:
+            return Statistics(0, None, None, None, None)
+        return Statistics(len(values), min(values), max(values), math.fsum(values) / len(values),
+                          math.sqrt(math.fsum(value * value for value in values) / len(values)))
+
+    def integral(self, name, start=None, end=None):
+        """ Trapezoidal integral of a column over time in value hours, intervals with missing values are skipped. """
+        first, last = self._window(start, end)
+        timestamps = self._data[0][first:last]
+        values = self._data[COLUMNS.index(name)][first:last]
+        if self.use_numpy:
+            areas = (values[1:] + values[:-1]) * numpy.diff(timestamps) / 2
+            return float(numpy.nansum(areas)) / 3600
+
+        total = math.fsum((values[i] + values[i - 1]) * (timestamps[i] - timestamps[i - 1]) / 2
+                          for i in range(1, len(values))
+                          if not (math.isnan(values[i]) or math.isnan(values[i - 1])))
+        return total / 3600
+
+    def energy(self, start=None, end=None):
+        """ Energy in Wh within a time window, integrated from the measured power. """
+        return self.integral("power", start, end)
+
+    def charge(self, start=None, end=None):
+        """ Charge in Ah within a time window, integrated from the measured current. """
+        return self.integral("current", start, end)
+
+    def summary(self, start=None, end=None):
+        """ Statistics of all measured columns with energy and charge within a time window.
+
+        :rtype: BufferSummary
+        """
+        first, last = self._window(start, end)
+        duration = self._data[0][last - 1] - self._data[0][first] if last > first else 0.0
+        return BufferSummary(last - first, float(duration), self.statistics("voltage", start, end),
+                             self.statistics("current", start, end), self.statistics("power", start, end),
+                             self.energy(start, end), self.charge(start, end))
@@ -0,0 +1,292 @@
+"""
+Configuration of a load as a plain document.
+
+A configuration is a dict, or a JSON or TOML file, holding any of the following sections. Only the keys present
+are read from the load and compared, commands are only sent for values that differ:
+
+{
+    "settings": {"beep": False, "lock": False, "trigger": False, "compensation": False, "dhcp": False,
+                 "ipaddress": "192.168.1.198", "subnetmask": "255.255.255.0", "gateway": "192.168.1.1",
+                 "port": 18190, "baudrate": 115200},
+    "limits": {"current": 30, "voltage": 120, "resistance": 7500, "power": 300},
+    "lists": {"1": {"current_range": 10, "steps": [[1, 0.1, 2], [2, 0.1, 2]], "loop_number": 3}},
+    "ocp": {"1": {"on_voltage": 1, ...}}, "opp": {...}, "batt": {"1": {"current_range": 10, ...}},
+    "function": "CC",
+    "setpoints": {"current": 1.5},
+    "input": False,
+}
+
+from kelctl import apply_config, load_config
+
+changes = apply_config(load, load_config("bench.toml"))
+"""
+
+import json
+import math
+from .kelctl import *
+
+# key to query of the values compared as single query responses
+_on_off_settings = {
+    "beep": ":SYST:BEEP?",
+    "lock": ":SYST:LOCK?",
+    "trigger": ":SYST:EXIT?",
+    "compensation": ":SYST:COMP?",
+    "dhcp": ":SYST:DHCP?",
+}
+_network_settings = {
+    "ipaddress": ":SYST:IPAD?",
+    "subnetmask": ":SYST:SMASK?",
+    "gateway": ":SYST:GATE?",
+    "macaddress": ":SYST:MAC?",
+    "port": ":SYST:PORT?",
+}
+_limit_queries = {
+    "current": ":CURR:UPP?",
+    "voltage": ":VOLT:UPP?",
+    "resistance": ":RES:UPP?",
+    "power": ":POW:UPP?",
+}
+_setpoint_queries = {
+    "current": ":CURR?",
+    "voltage": ":VOLT?",
+    "resistance": ":RES?",
+    "power": ":POW?",
+}
+
+# slot section to list class and setter, see slot_commands for reading them
+slot_sections = {
+    "lists": (LoadList, "set_list"),
+    "ocp": (OCPList, "set_ocp"),
+    "opp": (OPPList, "set_opp"),
+    "batt": (BattList, "set_batt"),
+}
+
+
+def load_config(path):
+    """ Read a configuration from a JSON or, by the .toml extension, TOML file. """
+    if str(path).endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            import tomli as tomllib  # python 3.10
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def slot_object(section, slot, fields):
+    """ Build the list object of a slot section entry. """
+    list_class = slot_sections[section][0]
+    if list_class is LoadList:
+        steps = [ListStep(**step) if isinstance(step, dict) else ListStep(*step) for step in fields["steps"]]
+        return LoadList(int(slot), fields["current_range"], steps, fields.get("loop_number", 1))
+    return list_class(int(slot), **fields)
+
+
+def slot_fields(list_object):
+    """ Fields of a list object as stored in a slot section entry. """
+    fields = {name: value for name, value in vars(list_object).items() if name != "save_slot"}
+    if isinstance(list_object, LoadList):
+        fields["steps"] = [[step.current, step.current_slope, step.duration] for step in list_object.steps]
+    return fields
+
+
+def _on_off(value):
+    if isinstance(value, bool):
+        return OnOffState.on if value else OnOffState.off
+    return on_off_lookup.get(value) or OnOffState(value)
+
+
+def _mode(value):
+    if isinstance(value, Mode):
+        return value
+    return mode_lookup.get(value) or Mode[value]
+
+
+def _baudrate(value):
+    if isinstance(value, BaudRate):
+        return value
+    return baudrate_lookup.get(str(value)) or BaudRate(value)
+
+
+def _same(current, desired):
+    if isinstance(current, float) and isinstance(desired, (int, float)):
+        return math.isclose(current, desired, rel_tol=1e-4, abs_tol=1e-4)
+    return current == desired
+
+
+def check_config(config):
+    """ Raise a ValueError for unknown sections or keys of a configuration, and for a function or input that can not
+    be set.
+    """
+    keys = {
+        "settings": set(_on_off_settings) | set(_network_settings) | {"baudrate"},
+        "limits": set(_limit_queries),
+        "setpoints": set(_setpoint_queries),
+    }
+    for section in config:
+        if section not in keys and section not in slot_sections and section not in ("function", "input"):
+            raise ValueError("unknown configuration section {0!r}".format(section))
+    for section, known in keys.items():
+        for key in config.get(section, {}):
+            if key not in known:
+                raise ValueError("unknown key {0!r} in configuration section {1!r}".format(key, section))
+    if "function" in config:
+        try:
+            function = _mode(config["function"])
+        except (KeyError, TypeError):
+            raise ValueError("unknown function {0!r}".format(config["function"])) from None
+        if function not in settableModes:
+            raise ValueError("function {0} can not be set".format(function.value))
+    if "input" in config:
+        _on_off(config["input"])
+
+
+def read_config(load, config=None, refresh=False):
+    """ Read the configuration of a load.
+
+    Stored slots are served from the slot cache, only slots not cached are recalled and read from the load.
+
+    :param config: only read the keys present in this configuration, None reads everything but the stored slots
+    :param refresh: read all stored slots from the load, even if cached
+    :return: configuration dict with the current values
+    """
+    if config is not None:
+        check_config(config)
+    if config is None:
+        config = {
+            "settings": dict.fromkeys(list(_on_off_settings) + list(_network_settings) + ["baudrate"]),
+            "limits": dict.fromkeys(_limit_queries),
+            "function": None,
+            "setpoints": dict.fromkeys(_setpoint_queries),
+            "input": None,
+        }
+
+    # all single values are read as one batch
+    keys = []
+    queries = []
+    for key in config.get("settings", {}):
+        keys.append(("settings", key))
+        queries.append(_on_off_settings.get(key) or _network_settings.get(key) or ":SYST:BAUD?")
+    for key in config.get("limits", {}):
+        keys.append(("limits", key))
+        queries.append(_limit_queries[key])
+    for key in config.get("setpoints", {}):
+        keys.append(("setpoints", key))
+        queries.append(_setpoint_queries[key])
+    # writing setpoints or recalling slots switches the function, it is set again afterwards
+    if any(section in config for section in ("function", "setpoints") + tuple(slot_sections)):
+        keys.append(("function", None))
+        queries.append(":FUNC?")
+    if "input" in config:
+        keys.append(("input", None))
+        queries.append(":INP?")
+
+    current = {}
+    for (section, key), value in zip(keys, load.query(*queries) if queries else []):
+        if key is None:
+            current[section] = value
+        else:
+            current.setdefault(section, {})[key] = value
+
+    slots = {section: list(config[section]) for section in slot_sections if section in config}
+    if slots:
+        current.update(load.dump_slots(slots, cached=not refresh))
+    return current
+
+
+def diff_config(current, config):
+    """ Compare a configuration against the current one.
+
+    :return: dict of (section, key) to (current value, desired value) for every value that differs
+    """
+    differences = {}
+
+    def compare(section, key, have, want):
+        if not _same(have, want):
+            differences[(section, key)] = (have, want)
+
+    for key, value in config.get("settings", {}).items():
+        have = current.get("settings", {}).get(key)
+        if key in _on_off_settings:
+            compare("settings", key, have, _on_off(value))
+        elif key == "baudrate":
+            compare("settings", key, have, _baudrate(value))
+        elif key == "macaddress":
+            compare("settings", key, str(have).lower().replace(":", "-"), value.lower().replace(":", "-"))
+        else:
+            compare("settings", key, have, value)
+    for section in ("limits", "setpoints"):
+        for key, value in config.get(section, {}).items():
+            compare(section, key, current.get(section, {}).get(key), float(value))
+    for section in slot_sections:
+        for slot, fields in config.get(section, {}).items():
+            have = current.get(section, {}).get(str(slot))
+            want = slot_object(section, slot, fields)
+            if have is None or slot_object(section, slot, have) != want:
+                differences[(section, str(slot))] = (have, slot_fields(want))
+    if "function" in config:
+        compare("function", None, current.get("function"), _mode(config["function"]))
+    if "input" in config:
+        compare("input", None, current.get("input"), _on_off(config["input"]))
+    return differences
+
+
+def apply_config(load, config, refresh=False):
+    """ Apply a configuration, only values that differ from the current state are written.
+
+    Limits are written before setpoints. Writing a setpoint or a stored slot switches the function of the load, so
+    the function is set after them, to the configured one or else back to the one read before. Stored slots are
+    compared against the slot cache, see read_config. A baud rate change is written last, the port has to be
+    reopened at the new rate afterwards.
+
+    :raises ValueError: for unknown sections or keys, a function that can not be set and invalid slots, before
+        anything is written
+
+    :param config: configuration dict, see load_config for reading it from a file
+    :param refresh: read all stored slots from the load instead of comparing against cached ones
+    :return: the differences that were applied, see diff_config
+    """
+    check_config(config)
+    # an invalid slot fails before anything is sent, reading a slot already recalls it
+    for section in slot_sections:
+        for slot, fields in config.get(section, {}).items():
+            slot_object(section, slot, fields).validate()
+
+    current = read_config(load, config, refresh)
+    differences = diff_config(current, config)
+
+    def changed(section):
+        return [(key, want) for (name, key), (_, want) in differences.items() if name == section]
+
+    slots = [(section, slot_object(section, slot, fields)) for section in slot_sections
+             for slot, fields in changed(section)]
+
+    for key, want in changed("settings"):
+        if key in _on_off_settings:
+            button = getattr(load.settings, key)
+            button.on() if want is OnOffState.on else button.off()
+        elif key != "baudrate":
+            setattr(load.settings, key, want)
+    for key, want in changed("limits"):
+        setattr(load.settings, key + "_limit", want)
+
+    for section, list_object in slots:
+        getattr(load, slot_sections[section][1])(list_object, recall=False)
+
+    setpoints = changed("setpoints")
+    for key, want in setpoints:
+        setattr(load, key, want)
+
+    if ("function", None) in differences:
+        load.function = differences[("function", None)][1]
+    elif slots or setpoints:
+        function = _mode(config["function"]) if "function" in config else current.get("function")
+        if function in settableModes:
+            load.function = function
+    if ("input", None) in differences:
+        load.input.on() if differences[("input", None)][1] is OnOffState.on else load.input.off()
+    if ("settings", "baudrate") in differences:
+        load.settings.baudrate = differences[("settings", "baudrate")][1]
+    return differences
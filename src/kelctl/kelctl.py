@@ -22,17 +22,65 @@ This library has been initially copied from the py-korad-serial project(https://
 
 """
 
-from time import sleep
+from time import sleep, monotonic
 from .kellists import *
 from .kelenums import *
 from .kelerrors import *
-import re
-import serial
-import ipaddress
+from .keldecode import *
+from bisect import bisect_left
+from collections import namedtuple
+from contextlib import contextmanager
+import copy
+import functools
+import itertools
+import queue
+import threading
+
+# serial, re, ipaddress, the UDP transport and concurrent.futures are imported where needed to keep imports fast
 
 # define Modes that support setting directly
 settableModes = [Mode.constant_voltage, Mode.constant_current, Mode.constant_resistance, Mode.constant_power, Mode.short]
 
+# priorities of requests in threaded mode, lower values are served first
+PRIORITY_HIGH = 0  # default for writes, i.e. setpoints
+PRIORITY_NORMAL = 1  # default for queries
+PRIORITY_BULK = 2  # i.e. background polling
+
+# define which limit dynamic modes are validated against
+dynamic_limits = {
+    Mode.dynamic_cv: "voltage",
+    Mode.dynamic_cc: "current",
+    Mode.dynamic_cr: "resistance",
+    Mode.dynamic_cw: "power",
+    Mode.dynamic_pulse: "current",
+    Mode.dynamic_toggle: "current",
+}
+
+# stored slot sections to their recall command, decoder and number of slots, see dump_slots
+slot_commands = {
+    "lists": (":RCL:LIST", parse_list, LIST_SLOTS),
+    "ocp": (":RCL:OCP", parse_ocp, 10),
+    "opp": (":RCL:OPP", parse_opp, 10),
+    "batt": (":RCL:BATT", parse_batt, 10),
+}
+
+# functions to the query and write format of their setpoint
+setpoint_commands = {
+    Mode.constant_current: (":CURR?", ":CURR {0:5.4f}A"),
+    Mode.constant_voltage: (":VOLT?", ":VOLT {0:5.4f}V"),
+    Mode.constant_resistance: (":RES?", ":RES {0:5.4f}OHM"),
+    Mode.constant_power: (":POW?", ":POW {0:5.4f}W"),
+}
+
+# queries the firmware leaves unanswered, i.e. for an empty slot, a timeout is not retried for these
+unanswered_queries = {":RCL:LIST?", ":RCL:OCP?", ":RCL:OPP?", ":RCL:BATT?", ":DYN?"}
+
+# multi-line responses to the start of their last line, reading stops there instead of at a fixed line count
+response_last_lines = {":SYST:DEVINFO?": "BAUDRATE:"}
+
+# baud rates in order of likelihood, the default first, see detect_baudrate
+baudrate_probe_order = (BaudRate.R115200, BaudRate.R9600, BaudRate.R57600, BaudRate.R38400, BaudRate.R19200)
+
 
 class Status(object):
 
@@ -45,11 +93,11 @@ class Status(object):
         super(Status, self).__init__()
         self.raw = status
         status_values = status.split(",")
-        self.beep = OnOffState(int(status_values[0]))
-        self.baudrate = BaudRate(int(status_values[1]))
-        self.lock = OnOffState(int(status_values[2]))
-        self.trigger = OnOffState(int(status_values[3]))
-        self.comm = OnOffState(int(status_values[4]))
+        self.beep = on_off_lookup.get(status_values[0]) or OnOffState(int(status_values[0]))
+        self.baudrate = baudrate_lookup.get(status_values[1]) or BaudRate(int(status_values[1]))
+        self.lock = on_off_lookup.get(status_values[2]) or OnOffState(int(status_values[2]))
+        self.trigger = on_off_lookup.get(status_values[3]) or OnOffState(int(status_values[3]))
+        self.comm = on_off_lookup.get(status_values[4]) or OnOffState(int(status_values[4]))
         # 1 more values is put out, unused according to documentation(though lock status and trigger status also is not mentioned and still available)
 
     def __repr__(self):
@@ -78,9 +126,164 @@ def float_or_none(value):
 
 def on_off_setting_or_none(value):
     try:
-        return OnOffState(value)
-    except (TypeError, ValueError):
+        return on_off_lookup.get(value)
+    except TypeError:
+        return None
+
+
+Snapshot = namedtuple("Snapshot", ["timestamp", "function", "input", "current", "voltage", "resistance", "power",
+                                   "current_limit", "voltage_limit", "resistance_limit", "power_limit",
+                                   "measured_voltage", "measured_current", "measured_power", "status"])
+Snapshot.__doc__ = """ State of the load read in one go, timestamp is the time.monotonic() value taken before querying. """
+
+CommandEvent = namedtuple("CommandEvent", ["timestamp", "name", "command", "bytes_sent", "bytes_received",
+                                           "write_latency", "response_latency", "timeout", "parse_failure"])
+CommandEvent.__doc__ = """ A command sent to the load as passed to stats callbacks.
+
+response_latency is None for writes. Parse failures are reported as an extra event after the command's event,
+with parse_failure set and no bytes or latencies.
+"""
+
+# upper bounds in seconds of the latency histogram buckets, the last bucket takes everything above
+latency_buckets = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0)
+
+# queries of a Snapshot, in order of its fields
+snapshot_queries = (":FUNC?", ":INP?", ":CURR?", ":VOLT?", ":RES?", ":POW?", ":CURR:UPP?", ":VOLT:UPP?", ":RES:UPP?",
+                    ":POW:UPP?", ":MEAS:VOLT?", ":MEAS:CURR?", ":MEAS:POW?", ":STAT?")
+
+
+def _unit_pattern(unit):
+    return r"\s*[-+]?\d*\.?\d+" + unit + "$"
+
+
+def _unit_value(unit):
+    return lambda result: float_or_none(result.rstrip(unit))
+
+
+_on_off_pattern = "(ON|OFF|0|1)$"
+_ip_pattern = r"\d{1,3}(\.\d{1,3}){3}$"
+
+# expected format (regular expression, compiled on first use) and decoder of query responses, used for decoding batches of queries and telling responses apart
+query_formats = {
+    "*IDN?": (None, str),
+    ":STAT?": (r"\d+(,\d+){4,}$", Status),
+    ":INP?": (_on_off_pattern, on_off_setting_or_none),
+    ":FUNC?": ("(" + "|".join(mode_lookup) + ")$", lambda result: mode_lookup.get(result) or Mode(result)),
+    ":CURR?": (_unit_pattern("A"), _unit_value("A")),
+    ":VOLT?": (_unit_pattern("V"), _unit_value("V")),
+    ":RES?": (_unit_pattern("OHM"), _unit_value("OHM")),
+    ":POW?": (_unit_pattern("W"), _unit_value("W")),
+    ":CURR:UPP?": (_unit_pattern("A"), _unit_value("A")),
+    ":VOLT:UPP?": (_unit_pattern("V"), _unit_value("V")),
+    ":RES:UPP?": (_unit_pattern("OHM"), _unit_value("OHM")),
+    ":POW:UPP?": (_unit_pattern("W"), _unit_value("W")),
+    ":MEAS:CURR?": (_unit_pattern("A"), _unit_value("A")),
+    ":MEAS:VOLT?": (_unit_pattern("V"), _unit_value("V")),
+    ":MEAS:POW?": (_unit_pattern("W"), _unit_value("W")),
+    ":BATT:TIM?": (_unit_pattern("M"), _unit_value("M")),
+    ":BATT:CAP?": (_unit_pattern("AH"), lambda result: float_or_none(result.replace("AH", ""))),
+    ":SYST:BEEP?": (_on_off_pattern, on_off_setting_or_none),
+    ":SYST:LOCK?": (_on_off_pattern, on_off_setting_or_none),
+    ":SYST:DHCP?": (_on_off_pattern, on_off_setting_or_none),
+    ":SYST:EXIT?": (_on_off_pattern, on_off_setting_or_none),
+    ":SYST:COMP?": (_on_off_pattern, on_off_setting_or_none),
+    ":SYST:BAUD?": (r"\d{4,6}$", lambda result: baudrate_lookup.get(result) or BaudRate(int(result))),
+    ":SYST:IPAD?": (_ip_pattern, str),
+    ":SYST:SMASK?": (_ip_pattern, str),
+    ":SYST:GATE?": (_ip_pattern, str),
+    ":SYST:MAC?": ("[0-9a-fA-F]{2}([-:][0-9a-fA-F]{2}){5}$", str),
+    ":SYST:PORT?": (r"\d+$", int),
+    # stored slots are decoded with the slot number, see keldecode
+    ":RCL:LIST?": (r"[^,]*A,\s*\d+,", str),
+    ":RCL:OCP?": (r"[^,]*V,[^,]*S,[^,]*A,[^,]*A,", str),
+    ":RCL:OPP?": (r"[^,]*V,[^,]*S,[^,]*A,[^,]*W,", str),
+    ":RCL:BATT?": (r"[^,]*A,[^,]*A,[^,]*V,[^,]*AH,", str),
+}
+
+
+def detect_baudrate(port, rates=baudrate_probe_order, timeout=0.2):
+    """ Find the baud rate a load runs at by probing an opened serial port with ``*IDN?``.
+
+    The port is left at the detected rate with its previous timeout.
+
+    :param port: opened serial.Serial, or another transport with baudrate and timeout attributes
+    :param rates: BaudRates to probe in order
+    :param timeout: seconds to wait for a response per rate
+    :rtype: BaudRate
+    """
+    previous_timeout = port.timeout
+    port.timeout = timeout
+    try:
+        for rate in rates:
+            port.baudrate = rate.b
+            port.reset_input_buffer()
+            # the leading newline ends whatever garbage the load received at a wrong rate
+            port.write(b"\n*IDN?\n")
+            try:
+                if "KEL" in port.readline().decode("ascii"):
+                    return rate
+            except UnicodeDecodeError:
+                pass
+    finally:
+        port.timeout = previous_timeout
+    raise BaudRateNotDetectedError(rates)
+
+
+def _copy_slot(list_object):
+    """ Copy of a stored slot's list object, so changing it does not change the slot cache. """
+    copied = copy.copy(list_object)
+    if isinstance(copied, LoadList):
+        copied.steps = [copy.copy(step) for step in copied.steps]
+    return copied
+
+
+@functools.lru_cache(maxsize=None)
+def _compile(pattern):
+    if pattern is None:
         return None
+    import re
+    return re.compile(pattern)
+
+
+def align_responses(queries, responses):
+    """ Assign responses to queries by their expected format.
+
+    A response not matching its query but a later one means the response to this query was dropped,
+    a response matching neither is discarded.
+
+    :return: list with a response or None per query
+    """
+    patterns = [_compile(query_formats.get(query, (None, None))[0]) for query in queries]
+    aligned = []
+    index = 0
+    for position, pattern in enumerate(patterns):
+        while index < len(responses):
+            response = responses[index]
+            if pattern is None or pattern.match(response):
+                aligned.append(response)
+                index += 1
+                break
+            if any(later is not None and later.match(response) for later in patterns[position + 1:]):
+                aligned.append(None)
+                break
+            index += 1
+        else:
+            aligned.append(None)
+    return aligned
+
+
+def response_matches(query, response):
+    """ Check a response against the expected format of its query, unknown queries match any response. """
+    pattern = _compile(query_formats.get(query, (None, None))[0])
+    return pattern is None or pattern.match(response) is not None
+
+
+def atomic(method):
+    """ Run a load operation made of several commands in one go, other threads can not interleave in threaded mode. """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self._call(lambda: method(self, *args, **kwargs))
+    return wrapper
 
 
 class KELSerial(object):
@@ -106,6 +309,107 @@ class KELSerial(object):
             """ Save the current value to this memory. """
             self.__serial.send("*SAV {0}".format(self.number))
 
+    class Memories(object):
+        """ Sequence of the 100 memories, a memory object is only created when it is first accessed. """
+
+        def __init__(self, memory_class, serial_):
+            super(KELSerial
+                  .Memories, self).__init__()
+            self._memory_class = memory_class
+            self.__serial = serial_
+            self._memories = [None] * 100
+
+        def __len__(self):
+            return len(self._memories)
+
+        def __getitem__(self, index):
+            if isinstance(index, slice):
+                return [self[i] for i in range(*index.indices(len(self._memories)))]
+            memory = self._memories[index]
+            if memory is None:
+                index %= len(self._memories)
+                memory = self._memories[index] = self._memory_class(self.__serial, index + 1)
+            return memory
+
+        def __iter__(self):
+            return (self[i] for i in range(len(self._memories)))
+
+    class ListChain(object):
+        """ A LoadList of more than 84 steps split across consecutive LIST slots.
+
+        start() recalls the following slots from a background thread as soon as the part before ended, the load
+        must not be used from another thread meanwhile unless it is in threaded mode. Every recall is sent ahead
+        by the time writing it takes, so it arrives when the part ends. The parts are stored looping
+        MIN_LIST_LOOPS times, so once the last part ended the input is switched off instead of letting it run again.
+        """
+
+        def __init__(self, serial_, parts, loop_number=1):
+            super(KELSerial
+                  .ListChain, self).__init__()
+            self.__serial = serial_
+            self.parts = parts
+            self.loop_number = loop_number
+            self.durations = [sum(step.duration for step in part.steps) for part in parts]
+            self._recalls = [":RCL:LIST " + str(part.save_slot) for part in parts]
+            self._stop = threading.Event()
+            self._thread = None
+
+        @property
+        def duration(self):
+            return sum(self.durations) * self.loop_number
+
+        def start(self, lead=None, input_on=False):
+            """ Start switching slots, either together with the input or right after the first part was started.
+
+            :param lead: seconds each recall is sent ahead of the end of the running part, to make up for latency,
+                None uses the mean time writing ``:RCL:LIST`` took so far, see KELSerial.stats
+            :param input_on: switch the input on, which starts the first part
+            """
+            if self._thread is not None:
+                return
+            if input_on:
+                self.__serial.send(":INP ON")
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(monotonic(), lead), name="kelctl-listchain",
+                                            daemon=True)
+            self._thread.start()
+
+        def _lead(self, lead):
+            if lead is not None:
+                return lead
+            timing = self.__serial.stats.commands.get(":RCL:LIST")
+            return timing.mean if timing is not None and timing.mean is not None else 0.0
+
+        def _run(self, start, lead):
+            elapsed = self.durations[0]
+            for loop in range(self.loop_number):
+                for index in range(1 if loop == 0 else 0, len(self.parts)):
+                    remaining = start + elapsed - self._lead(lead) - monotonic()
+                    if remaining > 0 and self._stop.wait(remaining):
+                        return
+                    self.__serial.send(self._recalls[index])
+                    elapsed += self.durations[index]
+            remaining = start + elapsed - self._lead(lead) - monotonic()
+            if remaining > 0 and self._stop.wait(remaining):
+                return
+            self.__serial.send(":INP OFF")
+
+        def stop(self):
+            """ Stop switching slots, the running part is not stopped and runs up to MIN_LIST_LOOPS times. """
+            self._stop.set()
+            self.wait()
+
+        def wait(self, timeout=None):
+            """ Wait until the last part ended and the input was switched off. """
+            if self._thread is not None and self._thread is not threading.current_thread():
+                self._thread.join(timeout)
+                if not self._thread.is_alive():
+                    self._thread = None
+
+        @property
+        def is_running(self):
+            return self._thread is not None and self._thread.is_alive()
+
     class OnOffButton(object):
         """ Wrap an on/off button. """
 
@@ -126,19 +430,353 @@ class KELSerial(object):
         def get(self):
             return on_off_setting_or_none(self.__serial.send_receive(self._get))
 
+    class CommandTiming(object):
+        """ Timing statistics of a single command, the whole time from writing it to reading its response. """
+
+        def __init__(self):
+            super(KELSerial
+                  .CommandTiming, self).__init__()
+            self.count = 0
+            self.failures = 0
+            self.total = 0.0
+            self.min = None
+            self.max = None
+            self.last = None
+
+        def add(self, elapsed, ok=True):
+            self.count += 1
+            if not ok:
+                self.failures += 1
+            self.total += elapsed
+            self.last = elapsed
+            self.min = elapsed if self.min is None else min(self.min, elapsed)
+            self.max = elapsed if self.max is None else max(self.max, elapsed)
+
+        @property
+        def mean(self):
+            return self.total / self.count if self.count else None
+
+        def __str__(self):
+            return "count: {0}, failures: {1}, mean: {2}, min: {3}, max: {4}".format(
+                self.count, self.failures, self.mean, self.min, self.max)
+
+    class Pacer(object):
+        """ Paces the commands sent to the load.
+
+        Instead of sleeping a fixed time after every command the pacer keeps a minimum gap, which is only
+        enforced between a write and the next command. A query is done as soon as its response arrived.
+        With adaptive pacing the gap shrinks after every `window` successful queries and grows again as
+        soon as a query fails, settling just above the point at which the load starts dropping commands.
+        Timings of the commands are kept by Stats.
+        """
+
+        def __init__(self, gap=0.1, adaptive=False, min_gap=0.005, max_gap=0.5, shrink=0.9, grow=2.0, window=20):
+            super(KELSerial
+                  .Pacer, self).__init__()
+            self.gap = gap
+            self.adaptive = adaptive
+            self.min_gap = min_gap
+            self.max_gap = max_gap
+            self.shrink = shrink
+            self.grow = grow
+            self.window = window
+            self._ready_at = 0.0
+            self._successes = 0
+
+        def delay(self):
+            """ Seconds left until the load is ready for the next command. """
+            return self._ready_at - monotonic()
+
+        def wait(self):
+            """ Block until the load is ready for the next command. """
+            remaining = self.delay()
+            if remaining > 0:
+                sleep(remaining)
+
+        def written(self):
+            """ Mark a write without response, the next command has to wait for the gap. """
+            self._ready_at = monotonic() + self.gap
+
+        def answered(self):
+            """ Mark a received response, the load is ready right away. """
+            self._ready_at = monotonic()
+
+        def record(self, command, ok=True):
+            """ Record whether a command succeeded and adapt the gap if enabled. """
+            if not self.adaptive:
+                return
+            if ok:
+                # a write without response proves nothing, only answered queries let the gap shrink
+                if not command.endswith("?"):
+                    return
+                self._successes += 1
+                if self._successes >= self.window:
+                    self._successes = 0
+                    self.gap = max(self.min_gap, self.gap * self.shrink)
+            else:
+                self._successes = 0
+                self.gap = min(self.max_gap, max(self.gap, self.min_gap) * self.grow)
+
+    class Histogram(object):
+        """ Counts of values per bucket, see latency_buckets. """
+
+        def __init__(self, bounds=latency_buckets):
+            super(KELSerial
+                  .Histogram, self).__init__()
+            self.bounds = bounds
+            self.counts = [0] * (len(bounds) + 1)
+            self.count = 0
+            self.total = 0.0
+            self.max = None
+
+        def add(self, value):
+            self.counts[bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.total += value
+            self.max = value if self.max is None else max(self.max, value)
+
+        @property
+        def mean(self):
+            return self.total / self.count if self.count else None
+
+        def percentile(self, percent):
+            """ Upper bound of the bucket holding the given percentile, max for the last bucket. """
+            if not self.count:
+                return None
+            rank = self.count * percent / 100.0
+            seen = 0
+            for bound, count in zip(self.bounds, self.counts):
+                seen += count
+                if seen >= rank:
+                    return min(bound, self.max)
+            return self.max
+
+        def __str__(self):
+            return "count: {0}, mean: {1}, p50: {2}, p99: {3}, max: {4}".format(
+                self.count, self.mean, self.percentile(50), self.percentile(99), self.max)
+
+    class CommandStats(CommandTiming):
+        """ Timing, counters and latency histograms of a single command.
+
+        Timeouts and responses failing to decode count as failures.
+        """
+
+        def __init__(self):
+            super(KELSerial
+                  .CommandStats, self).__init__()
+            self.bytes_sent = 0
+            self.bytes_received = 0
+            self.timeouts = 0
+            self.parse_failures = 0
+            self.write_latency = KELSerial.Histogram()
+            self.response_latency = KELSerial.Histogram()
+
+        def add(self, event):
+            if event.parse_failure:
+                self.parse_failures += 1
+                self.failures += 1
+                return
+            elapsed = event.write_latency + (event.response_latency or 0.0)
+            super(KELSerial
+                  .CommandStats, self).add(elapsed, not event.timeout)
+            self.bytes_sent += event.bytes_sent
+            self.bytes_received += event.bytes_received
+            if event.timeout:
+                self.timeouts += 1
+            self.write_latency.add(event.write_latency)
+            if event.response_latency is not None:
+                self.response_latency.add(event.response_latency)
+
+        def __str__(self):
+            return "count: {0}, sent: {1}B, received: {2}B, timeouts: {3}, parse failures: {4}, response: {5}".format(
+                self.count, self.bytes_sent, self.bytes_received, self.timeouts, self.parse_failures,
+                self.response_latency)
+
+    class Stats(object):
+        """ Per command statistics of the traffic with the load.
+
+        Commands are recorded by name, the command without its arguments, i.e. ":CURR 1.5A" as ":CURR".
+        Callbacks are called with a CommandEvent for every command, on the thread doing the I/O,
+        so they should be quick.
+        """
+
+        def __init__(self):
+            super(KELSerial
+                  .Stats, self).__init__()
+            self.commands = {}
+            self.callbacks = []
+            # input buffer flushes after responses went missing or out of sync
+            self.resyncs = 0
+
+        def __getitem__(self, name):
+            return self.commands[name]
+
+        def add_callback(self, callback):
+            self.callbacks.append(callback)
+
+        def remove_callback(self, callback):
+            self.callbacks.remove(callback)
+
+        def reset(self):
+            self.commands = {}
+            self.resyncs = 0
+
+        def record(self, event):
+            stats = self.commands.get(event.name)
+            if stats is None:
+                stats = self.commands[event.name] = KELSerial.CommandStats()
+            stats.add(event)
+            for callback in self.callbacks:
+                callback(event)
+
+        def command(self, command, bytes_sent, bytes_received, write_latency, response_latency=None, timeout=False):
+            self.record(CommandEvent(monotonic(), command.split(" ")[0], command, bytes_sent, bytes_received,
+                                     write_latency, response_latency, timeout, False))
+
+        def parse_failed(self, command, response):
+            self.record(CommandEvent(monotonic(), command.split(" ")[0], command, 0, 0, None, None, False, True))
+
+        @property
+        def totals(self):
+            """ CommandStats summed over all commands, histograms and min/max are not summed. """
+            totals = KELSerial.CommandStats()
+            for stats in self.commands.values():
+                totals.count += stats.count
+                totals.failures += stats.failures
+                totals.total += stats.total
+                totals.bytes_sent += stats.bytes_sent
+                totals.bytes_received += stats.bytes_received
+                totals.timeouts += stats.timeouts
+                totals.parse_failures += stats.parse_failures
+            return totals
+
+        def __str__(self):
+            return "\n".join("{0}: {1}".format(name, stats) for name, stats in sorted(self.commands.items()))
+
     class Serial(object):
         """ Serial operations.
 
         There are some quirky things in communication. They go here.
         """
 
-        def __init__(self, port, rate=115200, debug=False, send_sleep_time=0.1):
+        def __init__(self, port, rate=115200, debug=False, send_sleep_time=0.1, adaptive_pacing=False, threaded=False,
+                     record=None, timeout=1, retries=1):
             super(KELSerial
                   .Serial, self).__init__()
 
-            self.send_sleep_time = send_sleep_time
+            self.stats = KELSerial.Stats()
+            self.pacer = KELSerial.Pacer(send_sleep_time, adaptive_pacing)
+            # contents of stored slots by (section, slot number), filled by set_* and served by get_*
+            self.slots = {}
+            # timeouts in seconds by command name overriding the port's, i.e. {":RCL:LIST?": 2}
+            self.timeouts = {}
+            self.retries = retries
             self.debug = debug
-            self.port = serial.Serial(port, rate, timeout=1)
+            if isinstance(port, str) and port.startswith("udp://"):
+                from .keltransport import UDPTransport
+                self.port = UDPTransport.from_url(port)
+                self.port.timeout = timeout
+            elif isinstance(port, str):
+                import serial
+                self.port = serial.Serial(port, rate, timeout=timeout)
+            else:
+                # already opened transport, see keltransport
+                self.port = port
+            if record is not None:
+                from .keltransport import RecordingTransport
+                self.port = RecordingTransport(self.port, record)
+            # received bytes not read yet, filled in bulk from transports offering read() like serial.Serial
+            self._buffer = bytearray()
+            self._bulk = hasattr(self.port, "read")
+
+            self._local = threading.local()
+            self._sequence = itertools.count()
+            self._queue = None
+            self._worker = None
+            if threaded:
+                self.start_worker()
+
+        # ##################################################################
+        # Threaded mode, a single worker thread owns the port and serves a prioritized request queue
+        # ##################################################################
+
+        @property
+        def threaded(self):
+            return self._worker is not None
+
+        def start_worker(self):
+            if self._worker is not None:
+                return
+            self._queue = queue.PriorityQueue()
+            self._worker = threading.Thread(target=self._work, name="kelctl-io", daemon=True)
+            self._worker.start()
+
+        def stop_worker(self):
+            """ Stop the worker after all queued requests have been served. """
+            if self._worker is None:
+                return
+            # sorts behind every request
+            self._queue.put((float("inf"), next(self._sequence), None, None))
+            if threading.current_thread() is not self._worker:
+                self._worker.join()
+            self._worker = None
+
+        def _work(self):
+            while True:
+                _, _, job, future = self._queue.get()
+                if job is None:
+                    return
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(job())
+                    except BaseException as e:
+                        future.set_exception(e)
+
+        @contextmanager
+        def priority(self, priority):
+            """ Use this priority for all requests made by the current thread within the block. """
+            previous = getattr(self._local, "priority", None)
+            self._local.priority = priority
+            try:
+                yield
+            finally:
+                self._local.priority = previous
+
+        def submit(self, job, priority=PRIORITY_NORMAL):
+            """ Run a callable on the worker thread and return a Future of its result.
+
+            Without worker or when called from the worker itself the callable is run right away.
+            """
+            override = getattr(self._local, "priority", None)
+            if override is not None:
+                priority = override
+
+            from concurrent.futures import Future
+            future = Future()
+            if self._worker is None or threading.current_thread() is self._worker:
+                future.set_running_or_notify_cancel()
+                try:
+                    future.set_result(job())
+                except BaseException as e:
+                    future.set_exception(e)
+            else:
+                self._queue.put((priority, next(self._sequence), job, future))
+            return future
+
+        def call(self, job, priority=PRIORITY_NORMAL):
+            """ Run a callable on the worker thread and wait for its result. """
+            if self._worker is None or threading.current_thread() is self._worker:
+                return job()
+            return self.submit(job, priority).result()
+
+        @property
+        def send_sleep_time(self):
+            """ Minimum gap in seconds between a write and the next command. """
+            return self.pacer.gap
+
+        @send_sleep_time.setter
+        def send_sleep_time(self, value):
+            self.pacer.gap = value
 
         def read_string(self, line_number=1):
             """ Read a string.
@@ -148,44 +786,264 @@ class KELSerial(object):
 
             :return: str
             """
-            output = ""
+            return self._read(line_number)[0]
 
-            for line in range(1, line_number + 1):
-                output += self.port.readline().decode()
+        def _read(self, line_number=1, timeout=None, last=None):
+            """ Read up to line_number lines, returning the string, number of bytes read and whether a line timed out.
 
+            Reading stops at the first line that timed out, or once a line starting with `last` completed a
+            multi-line response early.
+            """
+            lines = []
+            received = 0
+            timed_out = False
+
+            if timeout is not None:
+                previous_timeout = self.port.timeout
+                self.port.timeout = timeout
+            try:
+                while len(lines) < line_number:
+                    line, size, complete = self._readline()
+                    received += size
+                    if complete or line:
+                        lines.append(line)
+                    if not complete:
+                        timed_out = True
+                        break
+                    if last is not None and line.startswith(last):
+                        break
+            finally:
+                if timeout is not None:
+                    self.port.timeout = previous_timeout
+
+            output = "\n".join(lines).strip("\n")
             if self.debug:
                 print("read: {0}".format(output))
 
-            return output.strip('\n')
+            return output, received, timed_out
 
-        def send(self, text):
+        def _readline(self):
+            """ Take one line out of the receive buffer, filling it with everything the port has waiting.
+
+            Bytes that are not valid UTF-8 are replaced, such a line fails the format check of its query instead of
+            staying in the buffer.
+
+            :return: the line without terminator, number of bytes it took and whether the terminator arrived
+            """
+            buffer = self._buffer
+            end = buffer.find(b"\n")
+            while end < 0:
+                searched = len(buffer)
+                if self._bulk:
+                    # blocks up to the port timeout only if nothing is waiting
+                    chunk = self.port.read(self.port.in_waiting or 1)
+                else:
+                    chunk = self.port.readline()
+                if not chunk:
+                    size = len(buffer)
+                    line = buffer.decode(errors="replace")
+                    buffer.clear()
+                    return line, size, False
+                buffer += chunk
+                end = buffer.find(b"\n", searched)
+
+            with memoryview(buffer) as view:
+                line = str(view[:end], "utf-8", "replace")
+            del buffer[:end + 1]
+            return line, end + 1, True
+
+        def write(self, text):
+            """ Write a line, returns the number of bytes written. """
             if self.debug:
                 print("_send: ", text)
 
-            text = "%s\n" % text
-            self.port.write(text.encode('ascii'))
+            data = ("%s\n" % text).encode('ascii')
+            self.port.write(data)
+            return len(data)
 
-            sleep(self.send_sleep_time)  # may be needed, needs testing
+        def send(self, text):
+            self.call(lambda: self._send(text), PRIORITY_HIGH)
 
         def send_receive(self, text, line_number=1):
-            self.send(text)
+            return self.call(lambda: self._send_receive(text, line_number), PRIORITY_NORMAL)
 
-            return self.read_string(line_number)
+        def send_receive_parsed(self, text, parse, *args):
+            """ Send a query and decode its response with parse(*args, response).
 
-    def __init__(self, port, rate: BaudRate = BaudRate(115200), debug=False, send_sleep_time=0.1):
+            Responses parse rejects are counted as parse failures in the stats, missing ones already are timeouts.
+            """
+            response = self.send_receive(text)
+            try:
+                return parse(*args, response)
+            except (ValueError, InvalidModeError):
+                if response != "":
+                    self.stats.parse_failed(text, response)
+                raise
+
+        def _send(self, text):
+            self.pacer.wait()
+            start = monotonic()
+            sent = self.write(text)
+            self.pacer.written()
+            self.pacer.record(text)
+            self.stats.command(text, sent, 0, monotonic() - start)
+
+        def send_receive_many(self, queries, joined=False):
+            """ Send several queries at once and read their responses in order.
+
+            Queries are written back to back, or as a single ``;`` joined line if `joined` is set. Responses are
+            matched to queries by their expected format, the input buffer is flushed when responses went missing.
+            Commands not ending in ``?`` can be mixed in, they get no response.
+
+            :return: list with a response or None per query
+            """
+            return self.call(lambda: self._send_receive_many(queries, joined), PRIORITY_NORMAL)
+
+        def _send_receive_many(self, queries, joined=False):
+            if not queries:
+                return []
+            self.pacer.wait()
+            start = monotonic()
+            if joined:
+                self.write(";".join(queries))
+            else:
+                for query in queries:
+                    self.write(query)
+            written = monotonic()
+
+            asked = [query for query in queries if query.endswith("?")]
+            responses = []
+            latencies = []
+            for _ in asked:
+                response = self.read_string()
+                if response == "":
+                    break
+                responses.append(response)
+                latencies.append(monotonic() - written)
+            if queries[-1].endswith("?"):
+                self.pacer.answered()
+            else:
+                # the load may still be busy with the trailing commands
+                self.pacer.written()
+
+            aligned = align_responses(asked, responses)
+            if None in aligned:
+                self.resync()
+            write_latency = (written - start) / len(queries)
+            waited = monotonic() - written
+            index = 0
+            for query, response in zip(asked, aligned):
+                self.pacer.record(query, response is not None)
+                if response is None:
+                    self.stats.command(query, len(query) + 1, 0, write_latency, waited, True)
+                    continue
+                # responses discarded by align_responses are skipped
+                while responses[index] != response:
+                    index += 1
+                self.stats.command(query, len(query) + 1, len(response) + 1, write_latency, latencies[index])
+                index += 1
+            for query in queries:
+                if not query.endswith("?"):
+                    self.pacer.record(query)
+                    self.stats.command(query, len(query) + 1, 0, write_latency)
+
+            aligned = iter(aligned)
+            return [next(aligned) if query.endswith("?") else None for query in queries]
+
+        def _send_receive(self, text, line_number=1):
+            """ Send a query and read its response, queries are sent again up to `retries` times if their response
+            timed out, was cut off or does not match the expected format of query_formats.
+
+            :return: the response, "" if there was no valid one
+            """
+            attempts = self.retries + 1 if text.endswith("?") else 1
+            for attempt in range(attempts):
+                output, ok = self._exchange(text, line_number)
+                if ok:
+                    return output
+                # a late or stale response would otherwise be read for the next query
+                self.resync()
+                if output == "" and text in unanswered_queries:
+                    break
+            return "" if output and not response_matches(text, output) else output
+
+        def _exchange(self, text, line_number):
+            """ Single query and response, returns the response and whether it arrived complete and in sync. """
+            self.pacer.wait()
+            start = monotonic()
+            sent = self.write(text)
+            written = monotonic()
+            output, received, timeout = self._read(line_number, self.timeouts.get(text.split(" ")[0]),
+                                                   response_last_lines.get(text))
+            self.pacer.answered()
+            end = monotonic()
+            in_sync = response_matches(text, output)
+            self.pacer.record(text, output != "" and in_sync)
+            self.stats.command(text, sent, received, written - start, end - written, timeout)
+            # an empty line is a malformed response, nothing at all a timeout
+            if not in_sync and (output != "" or not timeout):
+                self.stats.parse_failed(text, output)
+
+            return output, not timeout and in_sync
+
+        def resync(self):
+            """ Drop everything received but not read yet. """
+            self._buffer.clear()
+            self.port.reset_input_buffer()
+            self.stats.resyncs += 1
+
+    def __init__(self, port, rate: BaudRate = BaudRate(115200), debug=False, send_sleep_time=0.1, adaptive_pacing=False,
+                 threaded=False, record=None, timeout=1, retries=1):
         super(KELSerial, self).__init__()
 
-        self.__serial = KELSerial.Serial(port, rate.b, debug, send_sleep_time)
+        self.__serial = KELSerial.Serial(port, rate.b, debug, send_sleep_time, adaptive_pacing, threaded, record,
+                                         timeout, retries)
+        self.__threaded = threaded
 
         # Memory recall/save buttons 1 through 100 -> mapped to memories 0 to 99
-        self.memories = [
-            KELSerial
-            .Memory(self.__serial, i) for i in range(1, 101)
-        ]
+        self.memories = KELSerial.Memories(KELSerial.Memory, self.__serial)
 
         self.input = KELSerial.OnOffButton(self.__serial, ":INP ON", ":INP OFF", ":INP?")
         self.settings = KELSerial.Settings(self.__serial)
 
+    @classmethod
+    def auto_connect(cls, port, upgrade=False, probe_timeout=0.2, rates=baudrate_probe_order, **kwargs):
+        """ Open a load running at an unknown baud rate, see detect_baudrate.
+
+        load = KELSerial.auto_connect('/dev/ttyACM0', upgrade=True)
+
+        :param port: name of the serial port, or an opened serial.Serial
+        :param upgrade: move a slower load to 115200 baud through Settings.baudrate and switch the port over
+        :param probe_timeout: seconds to wait for a response per probed rate
+        :param kwargs: further arguments of the constructor, its timeout is set on the port after probing
+        """
+        if isinstance(port, str):
+            import serial
+            port = serial.Serial(port, BaudRate.R115200.b, timeout=kwargs.get("timeout", 1))
+        try:
+            rate = detect_baudrate(port, rates, probe_timeout)
+        except BaudRateNotDetectedError:
+            port.close()
+            raise
+        # the constructor leaves the timeout of an opened port alone
+        if "timeout" in kwargs:
+            port.timeout = kwargs["timeout"]
+        load = cls(port, rate, **kwargs)
+
+        if upgrade and rate is not BaudRate.R115200:
+            def switch():
+                load.pacer.wait()
+                # stays at the old rate if the load did not switch
+                return detect_baudrate(port, (BaudRate.R115200, rate), probe_timeout)
+
+            load.settings.baudrate = BaudRate.R115200
+            try:
+                load._call(switch)
+            except BaudRateNotDetectedError:
+                load.close()
+                raise
+        return load
+
     class Settings(object):
         def __init__(self, serial_):
             super(KELSerial
@@ -198,55 +1056,117 @@ class KELSerial(object):
             self.trigger = KELSerial.OnOffButton(self.__serial, ":SYST:EXIT ON", ":SYST:EXIT OFF", ":SYST:EXIT?")
             self.compensation = KELSerial.OnOffButton(self.__serial, ":SYST:COMP ON", ":SYST:COMP OFF", ":SYST:COMP?")
 
+            # Limits are cached after first read and on every write, setpoint setters validate against the cache.
+            # With trust_cache set the limit properties will also be served from the cache.
+            self.trust_cache = False
+            self._limits = {}
+
             """
             Since changing limits seems to only work on upper limit there seems to be not much point of getting lower limit.
             This applies to all limits.
             """
+
+        _limit_commands = {
+            "current": (":CURR:UPP", "A"),
+            "voltage": (":VOLT:UPP", "V"),
+            "resistance": (":RES:UPP", "OHM"),
+            "power": (":POW:UPP", "W"),
+        }
+
+        def _read_limit(self, name):
+            command, unit = self._limit_commands[name]
+            value = float_or_none(self.__serial.send_receive(command + "?").rstrip(unit))
+            if value is None:
+                self._limits.pop(name, None)
+            else:
+                self._limits[name] = value
+            return value
+
+        def _write_limit(self, name, value):
+            command, unit = self._limit_commands[name]
+            self.__serial.send("{0} {1:5.4f}{2}".format(command, value, unit))
+            self._limits[name] = float(value)
+
+        def _get_limit(self, name):
+            if self.trust_cache:
+                return self.cached_limit(name)
+            return self._read_limit(name)
+
+        def cached_limit(self, name):
+            """ Return limit from cache, reading it from the device only if not cached yet.
+
+            :param name: one of "current", "voltage", "resistance" or "power"
+            :rtype: float or None
+            """
+            if name in self._limits:
+                return self._limits[name]
+            return self._read_limit(name)
+
+        def invalidate_limits(self):
+            """ Drop all cached limits, i.e. after limits were changed at the device directly. """
+            self._limits.clear()
+
+        def refresh_limits(self):
+            """ Read all limits from device into the cache.
+
+            :return: dict of limit name to value
+            """
+            return {name: self._read_limit(name) for name in self._limit_commands}
+
+        def store_limits(self, limits):
+            """ Store limits read by other means, i.e. with a batch of queries, in the cache.
+
+            :param limits: dict of limit name to value, None values are skipped
+            """
+            for name, value in limits.items():
+                if name not in self._limit_commands:
+                    raise ValueError("unknown limit {0!r}".format(name))
+                if value is not None:
+                    self._limits[name] = float(value)
+
         @property
         def current_limit(self):
-            result = self.__serial.send_receive(":CURR:UPP?")
-            return float_or_none(result.rstrip("A"))
+            return self._get_limit("current")
 
         @current_limit.setter
         def current_limit(self, value):
-            self.__serial.send(":CURR:UPP {0:5.4f}A".format(value))
+            self._write_limit("current", value)
 
         @property
         def voltage_limit(self):
-            result = self.__serial.send_receive(":VOLT:UPP?")
-            return float_or_none(result.rstrip("V"))
+            return self._get_limit("voltage")
 
         @voltage_limit.setter
         def voltage_limit(self, value):
-            self.__serial.send(":VOLT:UPP {0:5.4f}V".format(value))
+            self._write_limit("voltage", value)
 
         @property
         def resistance_limit(self):
-            result = self.__serial.send_receive(":RES:UPP?")
-            return float_or_none(result.rstrip("OHM"))
+            return self._get_limit("resistance")
 
         @resistance_limit.setter
         def resistance_limit(self, value):
-            self.__serial.send(":RES:UPP {0:5.4f}OHM".format(value))
+            self._write_limit("resistance", value)
 
         @property
         def power_limit(self):
-            result = self.__serial.send_receive(":POW:UPP?")
-            return float_or_none(result.rstrip("W"))
+            return self._get_limit("power")
 
         @power_limit.setter
         def power_limit(self, value):
-            self.__serial.send(":POW:UPP {0:5.4f}W".format(value))
+            self._write_limit("power", value)
 
         def factoryreset(self):
             self.__serial.send(":SYST:FACTRESET")
+            self.invalidate_limits()
+            self.__serial.slots.clear()
 
         @property
         def baudrate(self):
             result = self.__serial.send_receive(
                 ":SYST:BAUD?"
             )
-            return BaudRate(int(result))
+            return baudrate_lookup.get(result) or BaudRate(int(result))
 
         @baudrate.setter
         def baudrate(self, rate: BaudRate):
@@ -261,6 +1181,7 @@ class KELSerial(object):
 
         @subnetmask.setter
         def subnetmask(self, value: str):
+            import ipaddress
             ip = ipaddress.ip_address(value)
             self.__serial.send(":SYST:SMASK {0}".format(ip))
 
@@ -273,6 +1194,7 @@ class KELSerial(object):
 
         @ipaddress.setter
         def ipaddress(self, value: str):
+            import ipaddress
             ip = ipaddress.ip_address(value)
             self.__serial.send(":SYST:IPAD {0}".format(ip))
 
@@ -285,6 +1207,7 @@ class KELSerial(object):
 
         @gateway.setter
         def gateway(self, value: str):
+            import ipaddress
             ip = ipaddress.ip_address(value)
             self.__serial.send(":SYST:GATE {0}".format(ip))
 
@@ -298,6 +1221,7 @@ class KELSerial(object):
         @macaddress.setter
         def macaddress(self, value: str):
             """ verifying proper mac address """
+            import re
             if re.match("[0-9a-f]{2}([-:]?)[0-9a-f]{2}(\\1[0-9a-f]{2}){4}$", value.lower()):
                 self.__serial.send(":SYST:MAC {0}".format(value.replace(":", "-")))
             else:
@@ -336,166 +1260,258 @@ class KELSerial(object):
         """
         return self.__serial.port.isOpen()
 
+    @property
+    def pacer(self):
+        """ The Pacer used for spacing commands, gives access to the gap and adaptive pacing.
+        :rtype: KELSerial.Pacer
+        """
+        return self.__serial.pacer
+
+    @property
+    def stats(self):
+        """ Per command timings, counters and latency histograms, callbacks can be added to receive every command.
+        :rtype: KELSerial.Stats
+        """
+        return self.__serial.stats
+
+    @property
+    def timeouts(self):
+        """ Response timeouts in seconds by command name overriding the port timeout, i.e. {":RCL:LIST?": 2}.
+        :rtype: dict
+        """
+        return self.__serial.timeouts
+
+    @property
+    def retries(self):
+        """ How often a query is sent again after its response timed out, was cut off or was out of sync. """
+        return self.__serial.retries
+
+    @retries.setter
+    def retries(self, value):
+        self.__serial.retries = value
+
     def close(self):
         """ Close the serial port """
+        self.__serial.stop_worker()
         self.__serial.port.close()
 
     def open(self):
         """ Open the serial port """
         self.__serial.port.open()
+        if self.__threaded:
+            self.__serial.start_worker()
+
+    # ##################################################################
+    # Threaded mode
+    # ##################################################################
+
+    def _call(self, job):
+        return self.__serial.call(job)
+
+    def submit(self, operation, *args, priority=PRIORITY_NORMAL):
+        """ Run an operation on the I/O worker and return a Future of its result.
+
+        The operation is called with this load and args, all commands it sends are executed in one go:
+
+        future = load.submit(lambda l: l.measured_voltage, priority=PRIORITY_BULK)
+
+        Without threaded mode the operation is run right away and a completed Future is returned.
+        """
+        return self.__serial.submit(lambda: operation(self, *args), priority)
+
+    def priority(self, priority):
+        """ Context manager setting the priority of all requests made by the current thread within the block. """
+        return self.__serial.priority(priority)
 
     # ##################################################################
     # Load operations
     # ##################################################################
 
+    def query(self, *queries, joined=False, retry=True):
+        """ Send several queries in one go and return their decoded responses.
+
+        Responses are decoded according to query_formats, unknown queries return the raw string. Queries whose
+        response got dropped are sent once more on their own if `retry` is set, otherwise None is returned for them.
+
+        voltage, current, power = load.query(":MEAS:VOLT?", ":MEAS:CURR?", ":MEAS:POW?")
+
+        :param joined: send all queries as a single ``;`` joined line, the firmware has to support this
+        :rtype: list
+        """
+        responses = self.__serial.send_receive_many(queries, joined)
+        results = []
+        for query, response in zip(queries, responses):
+            if response is None and retry:
+                response = self.__serial.send_receive(query) or None
+            decoder = query_formats.get(query, (None, str))[1]
+            if response is None:
+                results.append(None)
+                continue
+            try:
+                result = decoder(response)
+            except (ValueError, InvalidModeError):
+                self.__serial.stats.parse_failed(query, response)
+                raise
+            if result is None:
+                self.__serial.stats.parse_failed(query, response)
+            results.append(result)
+        return results
+
+    def snapshot(self, joined=False):
+        """ Read the whole state of the load as one batch of queries.
+
+        The limits read are also stored in the limit cache.
+
+        :param joined: send all queries as a single ``;`` joined line, see query()
+        :rtype: Snapshot
+        """
+        timestamp = monotonic()
+        snapshot = Snapshot(timestamp, *self.query(*snapshot_queries, joined=joined))
+        self.settings.store_limits({name: getattr(snapshot, name + "_limit")
+                                    for name in ("current", "voltage", "resistance", "power")})
+        return snapshot
+
     def trigger(self):
         """Simulate an external trigger, used for Pulse and trigger dynamic mode"""
         self.__serial.send("*TRG")
 
+    @atomic
     def set_list(self, load_list: LoadList, recall=True):
+        """ Upload a LoadList, lists of more than 84 steps are split across consecutive slots.
+
+        :return: None, or a ListChain switching through the slots of a split list
+        """
         load_list.validate()
+        if load_list.slot_count > 1:
+            parts = load_list.split()
+            for part in parts:
+                self.__serial.send(part.__str__())
+                self._cache_slot("lists", part)
+            if recall:
+                self.recall_list(load_list.save_slot)
+            return KELSerial.ListChain(self.__serial, parts, load_list.loop_number)
+
         self.__serial.send(load_list.__str__())
+        self._cache_slot("lists", load_list)
 
         if recall:
             self.recall_list(load_list.save_slot)
 
     def recall_list(self, list_number: int):
-        if 1 > list_number > 7:
+        if 1 > list_number or list_number > 7:
             raise ValueError("save-slot can only be from 1-7")
 
         self.__serial.send(":RCL:LIST " + str(list_number))
 
+    @atomic
     def get_list(self, list_number: int):
 
-        if 1 > list_number > 7:
+        if 1 > list_number or list_number > 7:
             raise ValueError("save-slot can only be from 1-7")
 
-        self.recall_list(list_number)
-        list_string = self.__serial.send_receive(":RCL:LIST?")
-        if list_string == "":
-            raise ValueError("No saved data in slot")
-        list_string = list_string.replace(" ", "").replace("A/uS", "").replace("S", "").replace("A", "")
-
-        split_string = list_string.split(",")
-        current_range = float(split_string[0])
-        loop_number = int(split_string[-1])
-        split_string = split_string[2:-1]
-        steps = []
-        count = int(len(split_string) / 3)
-        for s in range(count):
-            steps.append(ListStep(float(split_string.pop(0)), float(split_string.pop(0)), float(split_string.pop(0))))
-
-        return LoadList(list_number, current_range, steps, loop_number)
+        return self._get_slot("lists", list_number)
 
+    @atomic
     def set_ocp(self, ocp_list: OCPList, recall=True):
         ocp_list.validate()
 
         self.__serial.send(ocp_list.__str__())
+        self._cache_slot("ocp", ocp_list)
 
         if recall:
             self.recall_ocp(ocp_list.save_slot)
 
     def recall_ocp(self, list_number: int):
-        if 1 > list_number > 10:
+        if 1 > list_number or list_number > 10:
             raise ValueError("save-slot can only be from 1-10")
 
         self.__serial.send(":RCL:OCP " + str(list_number))
 
+    @atomic
     def get_ocp(self, list_number: int):
 
-        if 1 > list_number > 10:
+        if 1 > list_number or list_number > 10:
             raise ValueError("save-slot can only be from 1-10")
 
-        self.recall_ocp(list_number)
-        list_string = self.__serial.send_receive(":RCL:OCP?")
-
-        list_string = list_string.replace(" ", "").replace("A", "").replace("S", "").replace("V", "")
-
-        split_string = list_string.split(",")
-        on_voltage = float(split_string[0])
-        on_delay = float(split_string[1])
-        current_range = float(split_string[2])
-        on_current = float(split_string[3])
-        step_current = float(split_string[4])
-        step_delay = float(split_string[5])
-        off_current = float(split_string[6])
-        ocp_voltage = float(split_string[7])
-        max_overcurrent = float(split_string[8])
-        min_overcurrent = float(split_string[9])
-
-        return OCPList(list_number, on_voltage, on_delay, current_range, on_current, step_current, step_delay, off_current, ocp_voltage, max_overcurrent, min_overcurrent)
+        return self._get_slot("ocp", list_number)
 
+    @atomic
     def set_opp(self, opp_list: OPPList, recall=True):
         opp_list.validate()
 
         self.__serial.send(opp_list.__str__())
+        self._cache_slot("opp", opp_list)
 
         if recall:
             self.recall_opp(opp_list.save_slot)
 
     def recall_opp(self, list_number: int):
-        if 1 > list_number > 10:
+        if 1 > list_number or list_number > 10:
             raise ValueError("save-slot can only be from 1-10")
 
         self.__serial.send(":RCL:OPP " + str(list_number))
 
+    @atomic
     def get_opp(self, list_number: int):
 
-        if 1 > list_number > 10:
+        if 1 > list_number or list_number > 10:
             raise ValueError("save-slot can only be from 1-10")
 
-        self.recall_opp(list_number)
-        list_string = self.__serial.send_receive(":RCL:OPP?")
-
-        list_string = list_string.replace(" ", "").replace("A", "").replace("S", "").replace("V", "").replace("W", "")
-
-        split_string = list_string.split(",")
-        on_voltage = float(split_string[0])
-        on_delay = float(split_string[1])
-        current_range = float(split_string[2])
-        on_power = float(split_string[3])
-        step_power = float(split_string[4])
-        step_delay = float(split_string[5])
-        off_power = float(split_string[6])
-        opp_voltage = float(split_string[7])
-        max_overpower = float(split_string[8])
-        min_overpower = float(split_string[9])
-
-        return OPPList(list_number, on_voltage, on_delay, current_range, on_power, step_power, step_delay, off_power,
-                       opp_voltage, max_overpower, min_overpower)
+        return self._get_slot("opp", list_number)
 
+    @atomic
     def set_batt(self, batt_list: BattList, recall=True):
         batt_list.validate()
 
         self.__serial.send(batt_list.__str__())
+        self._cache_slot("batt", batt_list)
 
         if recall:
             self.recall_batt(batt_list.save_slot)
 
     def recall_batt(self, list_number: int):
-        if 1 > list_number > 10:
+        if 1 > list_number or list_number > 10:
             raise ValueError("save-slot can only be from 1-10")
 
         self.__serial.send(":RCL:BATT " + str(list_number))
 
+    @atomic
     def get_batt(self, list_number: int):
 
-        if 1 > list_number > 10:
+        if 1 > list_number or list_number > 10:
             raise ValueError("save-slot can only be from 1-10")
 
-        self.recall_batt(list_number)
-        list_string = self.__serial.send_receive(":RCL:BATT?")
+        return self._get_slot("batt", list_number)
+
+    def _cache_slot(self, section, list_object):
+        self.__serial.slots[(section, list_object.save_slot)] = _copy_slot(list_object)
+
+    def _get_slot(self, section, list_number):
+        """ Serve a slot from the slot cache, otherwise recall and read it from the device into the cache. """
+        cached = self.__serial.slots.get((section, list_number))
+        if cached is not None:
+            return _copy_slot(cached)
 
-        list_string = list_string.replace(" ", "").replace("AH", "").replace("M", "").replace("V", "").replace("A", "")
+        command, parse, _ = slot_commands[section]
+        self.__serial.send("{0} {1}".format(command, list_number))
+        list_object = self.__serial.send_receive_parsed(command + "?", parse, list_number)
+        self._cache_slot(section, list_object)
+        return list_object
 
-        split_string = list_string.split(",")
-        current_range = float(split_string[0])
-        discharge_current = float(split_string[1])
-        cutoff_voltage = float(split_string[2])
-        cutoff_capacity = float(split_string[3])
-        cutoff_time = float(split_string[4])
+    def invalidate_slots(self, section=None):
+        """ Drop cached slot contents, i.e. after slots were changed at the device directly.
+
+        :param section: only drop the slots of "lists", "ocp", "opp" or "batt", None drops all
+        """
+        if section is None:
+            self.__serial.slots.clear()
+            return
+        for key in [key for key in self.__serial.slots if key[0] == section]:
+            del self.__serial.slots[key]
 
-        return BattList(list_number, current_range, discharge_current, cutoff_voltage, cutoff_capacity, cutoff_time)
+    def refresh_slots(self, slots=None):
+        """ Read stored slots from device into the slot cache, see dump_slots for the arguments. """
+        self.dump_slots(slots)
 
     def get_batt_time(self):
         batt_time = self.__serial.send_receive(":BATT:TIM?").replace("M", "")
@@ -505,87 +1521,105 @@ class KELSerial(object):
         batt_cap = self.__serial.send_receive(":BATT:CAP?").replace("AH", "")
         return float_or_none(batt_cap)
 
+    @atomic
+    def dump_slots(self, slots=None, cached=False):
+        """ Read stored LIST, OCP, OPP and BATT slots as one pipelined batch.
+
+        Reading a slot recalls it, which switches the function of the load. A settable function is set again
+        afterwards together with its setpoint, a dynamic mode by recalling it. A LIST, OCP, OPP or BATT function
+        is not restored, the slot it ran from can not be read from the load. Empty slots are left out, the slots
+        read are stored in the slot cache.
+
+        :raises InputOnError: if slots have to be read while the input is on, before any slot is recalled
+
+        backup = load.dump_slots()
+        json.dump(backup, f)
+
+        :param slots: dict of section ("lists", "ocp", "opp" or "batt") to slot numbers, None reads all slots
+        :param cached: serve slots from the slot cache, only slots not cached are read from the device
+        :return: dict of section to dict of slot number string to list fields, the format of apply_config
+        """
+        from .kelconfig import slot_fields
+        if slots is None:
+            slots = {section: range(1, count + 1) for section, (_, _, count) in slot_commands.items()}
+
+        queries = [":FUNC?"] + [query for query, _ in setpoint_commands.values()]
+        entries = []
+        read = False
+        for section, numbers in slots.items():
+            command, _, count = slot_commands[section]
+            for slot in numbers:
+                slot = int(slot)
+                if 1 > slot or slot > count:
+                    raise ValueError("save-slot can only be from 1-{0}".format(count))
+                list_object = self.__serial.slots.get((section, slot)) if cached else None
+                if list_object is not None:
+                    entries.append((section, slot, list_object, None))
+                    continue
+                # the function query after each slot keeps an empty slot's missing response apart from the next one
+                queries += ["{0} {1}".format(command, slot), command + "?", ":FUNC?"]
+                entries.append((section, slot, None, len(queries) - 2))
+                read = True
+
+        if read:
+            # each recall would switch the function while the load is sinking current
+            if on_off_setting_or_none(self.__serial.send_receive(":INP?")) is OnOffState.on:
+                raise InputOnError()
+            responses = self.__serial.send_receive_many(queries)
+
+            function = responses[0] and query_formats[":FUNC?"][1](responses[0])
+            if function in settableModes:
+                restore = [":FUNC {0}".format(function.value)]
+                setpoint = dict(zip(setpoint_commands, responses[1:])).get(function)
+                if setpoint is not None:
+                    query, write = setpoint_commands[function]
+                    restore.append(write.format(query_formats[query][1](setpoint)))
+                self.__serial.send_receive_many(restore)
+            elif function in dynamic_limits:
+                # recalling the dynamic mode switches back to it
+                self.__serial.send_receive(":DYN?")
+
+        document = {}
+        for section, slot, list_object, index in entries:
+            if list_object is None:
+                if responses[index] is None:
+                    self.__serial.slots.pop((section, slot), None)
+                    continue
+                try:
+                    list_object = slot_commands[section][1](slot, responses[index])
+                except ValueError:
+                    self.__serial.stats.parse_failed(queries[index], responses[index])
+                    raise
+                self._cache_slot(section, list_object)
+            document.setdefault(section, {})[str(slot)] = slot_fields(list_object)
+        return document
+
+    def restore_slots(self, document):
+        """ Write stored slots of a dump_slots document back, slots already matching are skipped.
+
+        :return: the slots written, see apply_config
+        """
+        from .kelconfig import apply_config
+        return apply_config(self, {section: document[section] for section in slot_commands if section in document})
+
+    @atomic
     def get_dynamic_mode(self):
-        if self.function not in [Mode.dynamic_cv, Mode.dynamic_cc, Mode.dynamic_cr, Mode.dynamic_cw, Mode.dynamic_pulse,
-                                 Mode.dynamic_toggle]:
-            raise InvalidModeError(self.function)
-
-        list_string = self.__serial.send_receive(":DYN?")
-        list_string = list_string.replace(" ", "").replace("AH", "").replace("V", "").replace("A/uS", "").replace("HZ", "").replace("%", "").replace("A", "").replace("OHM", "").replace("W", "").replace("S", "")
-        split_string = list_string.split(",")
-        mode_string = int(split_string[0])
-
-        match mode_string:
-            case 1:
-                voltage1 = float(split_string[1])
-                voltage2 = float(split_string[2])
-                frequency = float(split_string[3])
-                duty_cycle = float(split_string[4])
-
-                return CVList(voltage1, voltage2, frequency, duty_cycle)
-            case 2:
-                slope1 = float(split_string[1])
-                slope2 = float(split_string[2])
-                current1 = float(split_string[3])
-                current2 = float(split_string[4])
-                frequency = float(split_string[5])
-                duty_cycle = float(split_string[6])
-
-                return CCList(slope1, slope2, current1, current2, frequency, duty_cycle)
-            case 3:
-                resistance1 = float(split_string[1])
-                resistance2 = float(split_string[2])
-                frequency = float(split_string[3])
-                duty_cycle = float(split_string[4])
-
-                return CRList(resistance1, resistance2, frequency, duty_cycle)
-            case 4:
-                power1 = float(split_string[1])
-                power2 = float(split_string[2])
-                frequency = float(split_string[3])
-                duty_cycle = float(split_string[4])
-
-                return CWList(power1, power2, frequency, duty_cycle)
-            case 5:
-                slope1 = float(split_string[1])
-                slope2 = float(split_string[2])
-                current1 = float(split_string[3])
-                current2 = float(split_string[4])
-                duration = float(split_string[5])
-
-                return PulseList(slope1, slope2, current1, current2, duration)
-            case 6:
-                slope1 = float(split_string[1])
-                slope2 = float(split_string[2])
-                current1 = float(split_string[3])
-                current2 = float(split_string[4])
-
-                return ToggleList(slope1, slope2, current1, current2)
-            case _:
-                raise InvalidModeError(list_string)
+        function = self.function
+        if function not in dynamic_limits:
+            raise InvalidModeError(function)
+
+        return self.__serial.send_receive_parsed(":DYN?", parse_dynamic_mode)
 
     def recall_dynamic_mode(self):
         return self.__serial.send_receive(":DYN?")
 
+    @atomic
     def set_dynamic_mode(self, dynamic_list, recall=True):
 
-        match dynamic_list.function:
-            case Mode.dynamic_cv:
-                limit = self.settings.voltage_limit
-            case Mode.dynamic_cc:
-                limit = self.settings.current_limit
-            case Mode.dynamic_cr:
-                limit = self.settings.resistance_limit
-            case Mode.dynamic_cw:
-                limit = self.settings.power_limit
-            case Mode.dynamic_pulse:
-                limit = self.settings.current_limit
-            case Mode.dynamic_toggle:
-                limit = self.settings.current_limit
-            case _:
-                raise ValueError()
-
-        dynamic_list.validate(limit)
+        if dynamic_list.function not in dynamic_limits:
+            raise ValueError()
+
+        dynamic_list.validate(self.settings.cached_limit(dynamic_limits[dynamic_list.function]))
 
         self.__serial.send(dynamic_list.__str__())
 
@@ -623,9 +1657,7 @@ class KELSerial(object):
         :rtype: KELSerial
     .Status or None
         """
-        self.__serial.send(":STAT?")
-
-        status = self.__serial.read_string()
+        status = self.__serial.send_receive(":STAT?")
         if len(status) == 0:
             return None
         else:
@@ -639,7 +1671,7 @@ class KELSerial(object):
         if len(result) == 0:
             return None
         else:
-            return Mode(result)
+            return mode_lookup.get(result) or Mode(result)
 
     @function.setter
     def function(self, mode: Mode):
@@ -657,7 +1689,7 @@ class KELSerial(object):
 
     @current.setter
     def current(self, value):
-        limit = self.settings.current_limit
+        limit = self.settings.cached_limit("current")
         if value <= limit:
             self.__serial.send(":CURR {0:5.4f}A".format(value))
         else:
@@ -669,7 +1701,7 @@ class KELSerial(object):
 
     @voltage.setter
     def voltage(self, value):
-        limit = self.settings.voltage_limit
+        limit = self.settings.cached_limit("voltage")
         if value <= limit:
             self.__serial.send(":VOLT {0:5.4f}V".format(value))
         else:
@@ -681,7 +1713,7 @@ class KELSerial(object):
 
     @resistance.setter
     def resistance(self, value):
-        limit = self.settings.resistance_limit
+        limit = self.settings.cached_limit("resistance")
         if value <= limit:
             self.__serial.send(":RES {0:5.4f}OHM".format(value))
         else:
@@ -693,7 +1725,7 @@ class KELSerial(object):
 
     @power.setter
     def power(self, value):
-        limit = self.settings.power_limit
+        limit = self.settings.cached_limit("power")
         if value <= limit:
             self.__serial.send(":POW {0:5.4f}W".format(value))
         else:
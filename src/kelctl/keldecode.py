@@ -0,0 +1,144 @@
+"""
+Table-driven decoding of the responses to the ``:RCL:*?`` and ``:DYN?`` queries.
+
+Responses are split into numbers and their units in a single pass by one compiled tokenizer. Every response
+type has a table entry with the units expected per field, so field count and units are validated before
+the list objects are built. Malformed responses raise a ResponseFormatError.
+"""
+
+import functools
+from .kellists import *
+from .kelerrors import *
+
+
+# a number, an optional unit and the separator, longer units first so "AH" and "A/uS" are not taken for "A",
+# compiled on first use
+@functools.lru_cache(maxsize=None)
+def _token():
+    import re
+    return re.compile(r"\s*([-+]?(?:\d+\.?\d*|\.\d+))\s*(A/uS|OHM|AH|HZ|A|V|W|S|M|%)?\s*(,|$)")
+
+
+def tokenize(response):
+    """ Split a response into a list of (number, unit) string tuples, unit is "" for plain numbers. """
+    token = _token()
+    tokens = []
+    position = 0
+    end = len(response)
+    while position < end:
+        match = token.match(response, position)
+        if match is None:
+            raise ResponseFormatError(response, "Unexpected characters at position {0}".format(position))
+        tokens.append((match.group(1), match.group(2) or ""))
+        if not match.group(3):
+            return tokens
+        position = match.end()
+    if response.rstrip().endswith(","):
+        raise ResponseFormatError(response, "Response ends with a separator")
+    return tokens
+
+
+class ResponseDecoder(object):
+    """ Decoder for one response type, validating units of all fields and converting them to floats. """
+
+    def __init__(self, units, build):
+        """
+        :param units: list of units expected per field, "" for plain numbers
+        :param build: callable taking any leading arguments followed by the values of all fields
+        """
+        super(ResponseDecoder, self).__init__()
+        self.units = units
+        self.build = build
+
+    def values(self, tokens, response):
+        if len(tokens) != len(self.units):
+            raise ResponseFormatError(response, "Expected {0} fields, got {1}".format(len(self.units), len(tokens)))
+        for index, ((_, unit), expected) in enumerate(zip(tokens, self.units)):
+            if unit != expected:
+                raise ResponseFormatError(response, "Expected unit '{0}' for field {1}, got '{2}'".format(expected, index, unit))
+        return [float(number) for number, _ in tokens]
+
+    def decode(self, response, *args, tokens=None):
+        """ Decode a response, args are passed to build in front of the values. """
+        if tokens is None:
+            tokens = tokenize(response)
+        return self.build(*args, *self.values(tokens, response))
+
+
+def _load_list(list_number, current_range, step_count, *values):
+    steps = [ListStep(values[i], values[i + 1], values[i + 2]) for i in range(0, len(values) - 1, 3)]
+    return LoadList(list_number, current_range, steps, int(values[-1]))
+
+
+slot_decoders = {
+    "OCP": ResponseDecoder(["V", "S", "A", "A", "A", "S", "A", "V", "A", "A"], OCPList),
+    "OPP": ResponseDecoder(["V", "S", "A", "W", "W", "S", "W", "V", "W", "W"], OPPList),
+    "BATT": ResponseDecoder(["A", "A", "V", "AH", "M"], BattList),
+}
+
+# LIST responses have a variable number of steps, decoders are created per step count
+_list_decoders = {}
+
+
+def list_decoder(step_count):
+    decoder = _list_decoders.get(step_count)
+    if decoder is None:
+        decoder = _list_decoders[step_count] = ResponseDecoder(["A", ""] + ["A", "A/uS", "S"] * step_count + [""], _load_list)
+    return decoder
+
+
+# dynamic mode number to decoder of the fields following the mode number
+dynamic_decoders = {
+    1: ResponseDecoder(["V", "V", "HZ", "%"], CVList),
+    2: ResponseDecoder(["A/uS", "A/uS", "A", "A", "HZ", "%"], CCList),
+    3: ResponseDecoder(["OHM", "OHM", "HZ", "%"], CRList),
+    4: ResponseDecoder(["W", "W", "HZ", "%"], CWList),
+    5: ResponseDecoder(["A/uS", "A/uS", "A", "A", "S"], PulseList),
+    6: ResponseDecoder(["A/uS", "A/uS", "A", "A"], ToggleList),
+}
+
+
+def _check_empty(response):
+    if response == "":
+        raise ResponseFormatError(response, "No saved data in slot")
+
+
+def parse_list(list_number, list_string):
+    """ Build a LoadList from the response to ``:RCL:LIST?``. """
+    _check_empty(list_string)
+    tokens = tokenize(list_string)
+    if len(tokens) < 3:
+        raise ResponseFormatError(list_string, "List response is too short")
+    step_count = int(float(tokens[1][0]))
+    if len(tokens) != step_count * 3 + 3:
+        raise ResponseFormatError(list_string, "Expected {0} steps, got {1} fields".format(step_count, len(tokens)))
+    return list_decoder(step_count).decode(list_string, list_number, tokens=tokens)
+
+
+def parse_ocp(list_number, list_string):
+    """ Build an OCPList from the response to ``:RCL:OCP?``. """
+    _check_empty(list_string)
+    return slot_decoders["OCP"].decode(list_string, list_number)
+
+
+def parse_opp(list_number, list_string):
+    """ Build an OPPList from the response to ``:RCL:OPP?``. """
+    _check_empty(list_string)
+    return slot_decoders["OPP"].decode(list_string, list_number)
+
+
+def parse_batt(list_number, list_string):
+    """ Build a BattList from the response to ``:RCL:BATT?``. """
+    _check_empty(list_string)
+    return slot_decoders["BATT"].decode(list_string, list_number)
+
+
+def parse_dynamic_mode(list_string):
+    """ Build the matching dynamic list object from the response to ``:DYN?``. """
+    tokens = tokenize(list_string)
+    if not tokens or tokens[0][1] != "":
+        raise ResponseFormatError(list_string, "Missing dynamic mode number")
+    mode = int(float(tokens[0][0]))
+    if mode not in dynamic_decoders:
+        raise InvalidModeError(list_string)
+    return dynamic_decoders[mode].decode(list_string, tokens=tokens[1:])
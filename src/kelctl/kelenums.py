@@ -45,3 +45,10 @@ class OnOffState(MultiValueEnum):
     _init_ = 'a b c'
     off = (0, "OFF", "0")
     on = (1, "ON", "1")
+
+
+# raw responses to members, looking these up is much cheaper than calling the enums
+mode_lookup = {mode.value: mode for mode in Mode}
+baudrate_lookup = {str(value): rate for rate in BaudRate for value in (rate.a, rate.b)}
+on_off_lookup = {key: state for state in OnOffState for value in (state.a, state.b, state.c)
+                 for key in (value, str(value))}
@@ -39,3 +39,60 @@ class NoModeSetError(Exception):
         self.mode = mode
         self.message = message
         super().__init__(self.message)
+
+
+class ResponseFormatError(ValueError):
+    """Exception raised when a response from the device does not have the expected format.
+    Derived from ValueError, which was raised for malformed responses before.
+
+    Attributes:
+        response -- response that could not be decoded
+        message -- explanation of the error
+    """
+
+    def __init__(self, response, message="Response has unexpected format"):
+        self.response = response
+        self.message = message
+        super().__init__(self.message)
+
+
+class ReplayMismatchError(Exception):
+    """Exception raised when a command written to a ReplayTransport differs from the recorded one.
+
+    Attributes:
+        expected -- command that was recorded
+        actual -- command that was written
+        message -- explanation of the error
+    """
+
+    def __init__(self, expected, actual, message="Command differs from the recording"):
+        self.expected = expected
+        self.actual = actual
+        self.message = message
+        super().__init__("{0}: expected {1!r}, got {2!r}".format(self.message, expected, actual))
+
+
+class BaudRateNotDetectedError(Exception):
+    """Exception raised when a load answers at none of the probed baud rates.
+
+    Attributes:
+        rates -- baud rates that were probed
+        message -- explanation of the error
+    """
+
+    def __init__(self, rates, message="No response to *IDN? at any probed baud rate"):
+        self.rates = rates
+        self.message = message
+        super().__init__(self.message)
+
+
+class InputOnError(Exception):
+    """Exception raised when an operation that switches the function of the load is refused as the input is on.
+
+    Attributes:
+        message -- explanation of the error
+    """
+
+    def __init__(self, message="Input is on, recalling slots would switch the function while sinking current"):
+        self.message = message
+        super().__init__(self.message)
@@ -1,6 +1,12 @@
 from .kelerrors import *
 from .kelenums import *
 
+# LIST slots of the load and steps a single slot can hold
+LIST_SLOTS = 7
+MAX_LIST_STEPS = 84
+# lists looping fewer times make the load fail when reading them back, like empty slots, see KEL103-protocol.md
+MIN_LIST_LOOPS = 3
+
 
 class ListStep(object):
     def __init__(self, current: float, current_slope: float, duration: float):
@@ -31,11 +37,48 @@ class LoadList(object):
         list_string = list_string + "{steps}{loops}".format(steps=step_string, loops=self.loop_number)
         return list_string
 
-    def validate(self):
-        if 1 > self.save_slot or self.save_slot > 7:
+    @property
+    def slot_count(self):
+        """ Number of consecutive slots needed, lists of more than 84 steps are split across slots. """
+        return max(1, -(-len(self.steps) // MAX_LIST_STEPS))
+
+    def split(self):
+        """ Split into lists of evenly many steps in consecutive slots starting at save_slot.
+
+        The parts are stored with MIN_LIST_LOOPS loops so they can be read back, a ListChain switches to the next
+        part after a single pass.
+
+        :rtype: list of LoadList
+        """
+        count = self.slot_count
+        size, extra = divmod(len(self.steps), count)
+        parts = []
+        start = 0
+        for index in range(count):
+            end = start + size + (1 if index < extra else 0)
+            parts.append(LoadList(self.save_slot + index, self.current_range, self.steps[start:end], MIN_LIST_LOOPS))
+            start = end
+        return parts
+
+    def __eq__(self, other):
+        # compared as sent to the device, i.e. a list read back equals the one uploaded
+        return isinstance(other, LoadList) and str(self) == str(other)
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def validate(self, chained=True):
+        """ Check the list before uploading it.
+
+        :param chained: allow lists of more than 84 steps split across slots, see split()
+        """
+        if 1 > self.save_slot or self.save_slot > LIST_SLOTS:
             raise ValueError("save-slot can only be from 1-7")
-        if len(self.steps) > 84:
+        if not chained and len(self.steps) > MAX_LIST_STEPS:
             raise ValueError("a maximum of 84 steps is allowed")
+        if self.save_slot + self.slot_count - 1 > LIST_SLOTS:
+            raise ValueError("a maximum of 84 steps per slot is allowed, {0} steps need {1} slots from slot {2}".format(
+                len(self.steps), self.slot_count, self.save_slot))
         if len(self.steps) < 2:
             raise ValueError("a minimum of 2 steps is required")
         for s in self.steps:
@@ -69,6 +112,12 @@ class OCPList(object):
 
         return ocp_string
 
+    def __eq__(self, other):
+        return isinstance(other, OCPList) and str(self) == str(other)
+
+    def __hash__(self):
+        return hash(str(self))
+
     def validate(self):
         if 1 > self.save_slot or self.save_slot > 10:
             raise ValueError("save-slot can only be from 1-10")
@@ -109,6 +158,12 @@ class OPPList(object):
 
         return opp_string
 
+    def __eq__(self, other):
+        return isinstance(other, OPPList) and str(self) == str(other)
+
+    def __hash__(self):
+        return hash(str(self))
+
     def validate(self):
         if 1 > self.save_slot or self.save_slot > 10:
             raise ValueError("save-slot can only be from 1-10")
@@ -137,6 +192,12 @@ class BattList(object):
 
         return batt_string
 
+    def __eq__(self, other):
+        return isinstance(other, BattList) and str(self) == str(other)
+
+    def __hash__(self):
+        return hash(str(self))
+
     def validate(self):
         if 1 > self.save_slot or self.save_slot > 10:
             raise ValueError("save-slot can only be from 1-10")
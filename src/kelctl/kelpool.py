@@ -0,0 +1,126 @@
+"""
+Parallel control of many loads from one process.
+
+KELPool runs the same operation on all of its loads concurrently from a thread pool and returns the results
+keyed by load. A failing load does not affect the others, its exception is reported next to the results:
+
+from kelctl import KELPool
+
+with KELPool(['/dev/ttyACM0', '/dev/ttyACM1']) as pool:
+    pool.set("current", 1.5)
+    for port, sample in pool.measure().items():
+        print(port, sample.voltage)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+from .kelctl import *
+from .kelstream import Sample
+
+
+class PoolResults(dict):
+    """ Results of a pool operation keyed by load, exceptions of failed loads are kept in `errors`. """
+
+    def __init__(self):
+        super(PoolResults, self).__init__()
+        self.errors = {}
+
+    @property
+    def ok(self):
+        """ True if the operation succeeded on every load. """
+        return not self.errors
+
+    def raise_errors(self):
+        """ Raise the first exception if any load failed. """
+        for error in self.errors.values():
+            raise error
+
+
+class KELPool(object):
+    """
+    A group of loads controlled in parallel.
+    """
+
+    def __init__(self, loads, max_workers=None, **kwargs):
+        """ Initialize pool.
+
+        :param loads: dict of key to KELSerial, or list of ports, urls or transports which will be opened with the given keyword arguments
+        :param max_workers: number of threads, defaults to one per load
+        :param kwargs: passed to KELSerial when opening ports
+        """
+        super(KELPool, self).__init__()
+        self.loads = {}
+        # loads that could not be opened, key to exception
+        self.failed = {}
+
+        if isinstance(loads, dict):
+            self.loads.update(loads)
+        else:
+            for index, port in enumerate(loads):
+                key = port if isinstance(port, str) else index
+                try:
+                    self.loads[key] = KELSerial(port, **kwargs)
+                except Exception as e:
+                    self.failed[key] = e
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or max(len(self.loads), 1),
+                                            thread_name_prefix="kelpool")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, value, traceback):
+        self.close()
+        return False
+
+    def __len__(self):
+        return len(self.loads)
+
+    def __getitem__(self, key):
+        return self.loads[key]
+
+    def close(self):
+        """ Close all loads and stop the thread pool. """
+        self._executor.shutdown(wait=True)
+        for load in self.loads.values():
+            try:
+                load.close()
+            except Exception:
+                pass
+
+    def run(self, operation, *args, keys=None):
+        """ Run an operation on all loads concurrently.
+
+        :param operation: callable taking a load and args
+        :param keys: only run on the loads with these keys
+        :rtype: PoolResults
+        """
+        futures = {key: self._executor.submit(operation, self.loads[key], *args)
+                   for key in (keys if keys is not None else self.loads)}
+        results = PoolResults()
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                results.errors[key] = e
+        return results
+
+    def set(self, name, value, keys=None):
+        """ Set a property like "current" or "function" on all loads. """
+        return self.run(setattr, name, value, keys=keys)
+
+    def get(self, name, keys=None):
+        """ Read a property like "measured_voltage" or "status" from all loads. """
+        return self.run(getattr, name, keys=keys)
+
+    def measure(self, keys=None):
+        """ Read voltage, current and power of all loads as Samples. """
+        def measure(load):
+            timestamp = monotonic()
+            return Sample(timestamp, *load.query(":MEAS:VOLT?", ":MEAS:CURR?", ":MEAS:POW?"))
+
+        return self.run(measure, keys=keys)
+
+    def set_list(self, load_list: LoadList, recall=True, keys=None):
+        """ Upload a LoadList to all loads. """
+        return self.run(lambda load: load.set_list(load_list, recall), keys=keys)
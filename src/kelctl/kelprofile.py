@@ -0,0 +1,161 @@
+"""
+Host driven playback of setpoint profiles.
+
+Lists stored on the load are limited to 84 steps in 7 slots. ProfilePlayer plays profiles of any length by writing
+one setpoint per step from the host. Steps are scheduled on the monotonic clock relative to the start of the
+playback, so a late step does not delay the ones after it, and the timing of every step is recorded:
+
+from kelctl import ProfilePlayer
+
+player = ProfilePlayer.from_csv(load, "current", "drive_cycle.csv", interval=0.1)
+report = player.play()
+print(report.max_jitter, report.drift)
+"""
+
+from collections import namedtuple
+from time import monotonic
+import csv
+import threading
+from .kelenums import *
+from .kelerrors import *
+
+# quantity to the function it is played in
+profile_modes = {
+    "current": Mode.constant_current,
+    "voltage": Mode.constant_voltage,
+    "resistance": Mode.constant_resistance,
+    "power": Mode.constant_power,
+}
+
+ProfileStep = namedtuple("ProfileStep", ["duration", "value"])
+ProfileStep.__doc__ = """ A step of a profile, value is held for duration seconds. """
+
+StepTiming = namedtuple("StepTiming", ["index", "scheduled", "started", "written", "jitter"])
+StepTiming.__doc__ = """ Timing of a played step in seconds since playback started.
+
+started is when the step was due to be sent, written when its write returned, after any wait for the pacer.
+"""
+
+ProfileReport = namedtuple("ProfileReport", ["steps", "duration", "mean_jitter", "p99_jitter", "max_jitter", "drift"])
+ProfileReport.__doc__ = """ Timing summary of a playback.
+
+Jitter is how late a step's write went out compared to its schedule, drift is how late the playback ended.
+"""
+
+
+class ProfilePlayer(object):
+    """
+    Plays a current, voltage, resistance or power profile by writing setpoints from the host.
+
+    Every step is a single write, limits are checked for the whole profile before playback starts. The gap the
+    load's pacer keeps after writes has to be shorter than the steps, see ``KELSerial.pacer``.
+    """
+
+    def __init__(self, load, quantity, steps, interval=None, spin=0.002):
+        """ Initialize player.
+
+        :param load: KELSerial instance to play on
+        :param quantity: one of "current", "voltage", "resistance" or "power"
+        :param steps: sequence of (duration, value) tuples, or of values if interval is given
+        :param interval: duration of every step in seconds for profiles given as plain values
+        :param spin: seconds before a step that are busy waited instead of slept for better timing
+        """
+        super(ProfilePlayer, self).__init__()
+        if quantity not in profile_modes:
+            raise ValueError("quantity has to be one of {0}".format(", ".join(profile_modes)))
+
+        self.load = load
+        self.quantity = quantity
+        if interval is not None:
+            self.steps = [ProfileStep(float(interval), float(value)) for value in steps]
+        else:
+            self.steps = [ProfileStep(float(duration), float(value)) for duration, value in steps]
+        self.spin = spin
+        self.timings = []
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_csv(cls, load, quantity, path, interval=None, **kwargs):
+        """ Create player from a CSV file of duration,value rows, or of values only if interval is given.
+
+        Rows that do not hold numbers, like a header, are skipped.
+        """
+        steps = []
+        with open(path, newline="") as f:
+            for row in csv.reader(f):
+                try:
+                    numbers = [float(field) for field in row if field.strip()]
+                except ValueError:
+                    continue
+                if not numbers:
+                    continue
+                steps.append(numbers[0] if interval is not None else tuple(numbers[:2]))
+        return cls(load, quantity, steps, interval, **kwargs)
+
+    @property
+    def duration(self):
+        return sum(step.duration for step in self.steps)
+
+    def validate(self):
+        """ Check all steps against the limit of the load, the limit is read once. """
+        limit = self.load.settings.cached_limit(self.quantity)
+        for step in self.steps:
+            if step.duration < 0:
+                raise ValueError("step durations can not be negative")
+            if step.value > limit:
+                raise ValueOutOfLimitError(step.value, limit, "{0} value out of set limits".format(self.quantity))
+
+    def play(self, set_function=True):
+        """ Play the profile, blocks until it ended or stop() was called.
+
+        :param set_function: switch the load to the function of the quantity before playing
+        :rtype: ProfileReport
+        """
+        self.validate()
+        if set_function:
+            self.load.function = profile_modes[self.quantity]
+
+        self._stop.clear()
+        self.timings = []
+        start = monotonic()
+        scheduled = 0.0
+        for index, step in enumerate(self.steps):
+            if not self._wait(start + scheduled):
+                break
+            started = monotonic() - start
+            setattr(self.load, self.quantity, step.value)
+            written = monotonic() - start
+            self.timings.append(StepTiming(index, scheduled, started, written, written - scheduled))
+            scheduled += step.duration
+        else:
+            self._wait(start + scheduled)
+        return self.report(monotonic() - start - scheduled)
+
+    def _wait(self, deadline):
+        """ Wait until deadline, returns False if stopped. """
+        remaining = deadline - monotonic() - self.spin
+        if remaining > 0 and self._stop.wait(remaining):
+            return False
+        while monotonic() < deadline:
+            if self._stop.is_set():
+                return False
+        return not self._stop.is_set()
+
+    def stop(self):
+        """ Stop playback from another thread, the last setpoint stays active. """
+        self._stop.set()
+
+    def report(self, drift=None):
+        """ Timing summary of the last playback.
+
+        :rtype: ProfileReport
+        """
+        jitters = sorted(timing.jitter for timing in self.timings)
+        if not jitters:
+            return ProfileReport(0, 0.0, None, None, None, drift)
+        duration = self.timings[-1].scheduled + self.steps[self.timings[-1].index].duration
+        return ProfileReport(len(jitters), duration, sum(jitters) / len(jitters),
+                             jitters[min(len(jitters) - 1, int(len(jitters) * 0.99))], jitters[-1], drift)
+
+    def __len__(self):
+        return len(self.steps)
@@ -0,0 +1,361 @@
+"""
+Simulated KEL103 for testing and benchmarking without hardware.
+
+SimulatedKEL103 is a transport that can be passed to KELSerial in place of a serial port. It implements the
+command set described in KEL103-protocol.md, keeps the state of the load including memories and the stored
+LIST/OCP/OPP/BATT slots and answers queries the way the firmware formats them:
+
+from kelctl import KELSerial, SimulatedKEL103
+
+with KELSerial(SimulatedKEL103(latency=0.002)) as load:
+    load.current = 1.5
+    print("Voltage: ", load.measured_voltage)
+
+Measurements are derived from a simple source model, an ideal voltage source with series resistance.
+"""
+
+from collections import deque
+from time import monotonic, sleep
+import re
+
+# numbers with optional sign and decimals, units and whitespace are ignored
+_number = re.compile(r"[-+]?\d*\.?\d+")
+
+_baud_rates = [9600, 19200, 38400, 57600, 115200]
+
+_dynamic_modes = {1: "CONTINUOUS CV", 2: "CONTINUOUS CC", 3: "CONTINUOUS CR", 4: "CONTINUOUS CW", 5: "PULSE",
+                  6: "TOGGLE"}
+
+# units of the values returned by ``:DYN?`` for every dynamic mode
+_dynamic_units = {1: ["V", "V", "HZ", "%"], 2: ["A/uS", "A/uS", "A", "A", "HZ", "%"], 3: ["OHM", "OHM", "HZ", "%"],
+                  4: ["W", "W", "HZ", "%"], 5: ["A/uS", "A/uS", "A", "A", "S"], 6: ["A/uS", "A/uS", "A", "A"]}
+
+_limit_units = {"CURR": "A", "VOLT": "V", "RES": "OHM", "POW": "W"}
+_modes = {"CURR": "CC", "VOLT": "CV", "RES": "CR", "POW": "CW"}
+_device_limits = {"CURR": 30.0, "VOLT": 120.0, "RES": 7500.0, "POW": 300.0}
+
+
+def _numbers(text):
+    return [float(n) for n in _number.findall(text)]
+
+
+def _value(value, unit=""):
+    """ Format like the firmware does, 5 significant digits. """
+    digits = max(5 - len(str(int(abs(value)))), 0)
+    return "{0:.{1}f}{2}".format(value, digits, unit)
+
+
+def _field(value, unit):
+    """ Format a field of a recalled list, right aligned to 6 characters. """
+    return "{0:6.3f}{1}".format(value, unit)
+
+
+class SimulatedKEL103(object):
+    """
+    In-process KEL103 transport.
+
+    Every response becomes available `latency` seconds after its query was written, plus the transfer time of
+    the response at the given baud rate if `rate` is set. Queries the firmware would not answer, like recalling
+    an empty slot, return nothing and make readline wait for the timeout just as a serial port does.
+    """
+
+    def __init__(self, latency=0.0, rate=None, timeout=1, source_voltage=12.0, source_resistance=0.05,
+                 model="KORAD KEL103 V3.30 SN:00000000"):
+        """ Initialize simulated load.
+
+        :param latency: seconds until a response is available
+        :param rate: baud rate used to add transfer time per byte, None for no transfer time
+        :param timeout: seconds readline waits when no response is pending
+        :param source_voltage: open circuit voltage of the simulated source in Volts
+        :param source_resistance: internal resistance of the simulated source in Ohms
+        :param model: string returned by ``*IDN?``
+        """
+        super(SimulatedKEL103, self).__init__()
+        self.latency = latency
+        self.rate = rate
+        self.timeout = timeout
+        self.source_voltage = source_voltage
+        self.source_resistance = source_resistance
+        self.model = model
+        self.received = []
+        self._responses = deque()
+        self._open = True
+        self.reset()
+
+    def reset(self):
+        """ Reset to factory state, stored slots and memories are cleared. """
+        self.function = "CC"
+        self.input = False
+        self.setpoints = {"CURR": 0.0, "VOLT": 0.0, "RES": 0.0, "POW": 0.0}
+        self.limits = dict(_device_limits)
+        self.system = {"BEEP": "ON", "LOCK": "OFF", "DHCP": "0", "EXIT": "OFF", "COMP": "OFF"}
+        self.network = {"IPAD": "192.168.1.198", "SMASK": "255.255.255.0", "GATE": "192.168.1.1",
+                        "MAC": "70-2f-eb-48-4d-56", "PORT": "18190"}
+        self.baudrate = 115200
+        self.memories = {}
+        self.slots = {"LIST": {}, "OCP": {}, "OPP": {}, "BATT": {}}
+        self.recalled = {"LIST": None, "OCP": None, "OPP": None, "BATT": None}
+        self.dynamic = None
+        self.triggered = False
+        self._battery_start = None
+
+    # ##################################################################
+    # Transport interface
+    # ##################################################################
+
+    def open(self):
+        self._open = True
+
+    def close(self):
+        self._open = False
+
+    def isOpen(self):
+        return self._open
+
+    is_open = property(isOpen)
+
+    @property
+    def in_waiting(self):
+        now = monotonic()
+        return sum(len(data) for ready, data in self._responses if ready <= now)
+
+    def reset_input_buffer(self):
+        self._responses.clear()
+
+    def write(self, data):
+        for line in data.decode("ascii").splitlines():
+            # several commands can be joined by ';' into one line
+            for command in line.split(";"):
+                command = command.strip()
+                if command:
+                    self.received.append(command)
+                    response = self._execute(command)
+                    if response is not None:
+                        self._respond(response)
+        return len(data)
+
+    def readline(self):
+        if not self._responses:
+            sleep(self.timeout)
+            return b""
+        ready, data = self._responses[0]
+        remaining = ready - monotonic()
+        if remaining > self.timeout:
+            sleep(self.timeout)
+            return b""
+        if remaining > 0:
+            sleep(remaining)
+        self._responses.popleft()
+        return data
+
+    def read(self, size=1):
+        """ Read up to size bytes of responses, waiting up to the timeout for them to become available. """
+        data = bytearray()
+        deadline = monotonic() + self.timeout
+        while len(data) < size:
+            if not self._responses:
+                sleep(max(0.0, deadline - monotonic()))
+                break
+            ready, line = self._responses[0]
+            remaining = ready - monotonic()
+            if remaining > deadline - monotonic():
+                sleep(max(0.0, deadline - monotonic()))
+                break
+            if remaining > 0:
+                sleep(remaining)
+            part = line[:size - len(data)]
+            data += part
+            if len(part) == len(line):
+                self._responses.popleft()
+            else:
+                self._responses[0] = (ready, line[len(part):])
+        return bytes(data)
+
+    def _respond(self, response):
+        ready = (self._responses[-1][0] if self._responses else monotonic()) + self.latency
+        for line in response.split("\n"):
+            data = (line + "\n").encode("ascii")
+            if self.rate:
+                ready += len(data) * 10 / self.rate
+            self._responses.append((ready, data))
+
+    # ##################################################################
+    # Command handling
+    # ##################################################################
+
+    def _execute(self, line):
+        command, _, argument = line.partition(" ")
+        command = command.upper()
+        argument = argument.strip()
+        query = command.endswith("?")
+        command = command.rstrip("?")
+        parts = command.lstrip(":").split(":")
+
+        if command == "*IDN":
+            return self.model
+        if command == "*SAV":
+            self.memories[int(argument)] = (self.function, dict(self.setpoints))
+        elif command == "*RCL":
+            if int(argument) in self.memories:
+                self.function, setpoints = self.memories[int(argument)]
+                self.setpoints.update(setpoints)
+        elif command == "*TRG":
+            self.triggered = not self.triggered
+        elif parts[0] in ("SYST", "SYSTEM"):
+            return self._system(parts[1], query, argument)
+        elif parts[0] in ("STAT", "STATUS"):
+            return "{0},{1},{2},{3},{4},0".format(
+                int(self.system["BEEP"] == "ON"), _baud_rates.index(self.baudrate), int(self.system["LOCK"] == "ON"),
+                int(self.system["EXIT"] == "ON"), int(self.system["COMP"] == "ON"))
+        elif parts[0] in ("INP", "INPUT"):
+            if query:
+                return "ON" if self.input else "OFF"
+            self.input = argument.upper() == "ON"
+            self._battery_start = monotonic() if self.input and self.function == "BATTERY" else None
+        elif parts[0] in _limit_units:
+            return self._setpoint(parts, query, argument)
+        elif parts[0] in ("FUNC", "FUNCTION"):
+            if query:
+                return self.function
+            self.function = "SHORt" if argument.upper().startswith("SHOR") else argument.upper()
+        elif parts[0] in ("MEAS", "MEASURE"):
+            return self._measure(parts[1])
+        elif parts[0] in ("LIST", "OCP", "OPP"):
+            values = _numbers(argument)
+            self.slots[parts[0]][int(values[0])] = values[1:]
+        elif parts[0] in ("BATT", "BATTERY"):
+            return self._battery(parts, query, argument)
+        elif parts[0] == "RCL":
+            return self._recall(parts[1], query, argument)
+        elif parts[0] in ("DYN", "DYNAMIC"):
+            if query:
+                if self.dynamic is None:
+                    return None
+                mode, values = self.dynamic
+                self.function = _dynamic_modes[mode]
+                return ",".join([str(mode)] + [_field(v, u) for v, u in zip(values, _dynamic_units[mode])])
+            values = _numbers(argument)
+            self.dynamic = (int(values[0]), values[1:])
+        return None
+
+    def _system(self, name, query, argument):
+        if name in self.system:
+            if query:
+                return self.system[name]
+            self.system[name] = argument.upper()
+        elif name in self.network:
+            if query:
+                return self.network[name]
+            self.network[name] = argument
+        elif name == "BAUD":
+            if query:
+                return str(self.baudrate)
+            self.baudrate = int(argument)
+        elif name == "DEVINFO":
+            return "DHCP:{0}\nIP:{1}\nNETMASK:{2}\nGateWay:{3}\nMAC:{4}\nPORT:{5}\nBAUDRATE:{6}".format(
+                self.system["DHCP"], self.network["IPAD"], self.network["SMASK"], self.network["GATE"],
+                self.network["MAC"], self.network["PORT"], self.baudrate)
+        elif name == "FACTRESET":
+            self.reset()
+        return None
+
+    def _setpoint(self, parts, query, argument):
+        name = parts[0]
+        unit = _limit_units[name]
+        if len(parts) > 1:
+            # upper and lower limit, only the upper one can be set
+            if query:
+                return _value(self.limits[name] if parts[1] == "UPP" else 0.0, unit)
+            if parts[1] == "UPP":
+                self.limits[name] = min(_numbers(argument)[0], _device_limits[name])
+            return None
+        if query:
+            return _value(self.setpoints[name], unit)
+        self.setpoints[name] = min(_numbers(argument)[0], self.limits[name])
+        self.function = _modes[name]
+        return None
+
+    def _operating_point(self):
+        """ Return (voltage, current) of the source model in the present function. """
+        source, resistance = self.source_voltage, self.source_resistance
+        if not self.input:
+            return source, 0.0
+
+        function = self.function
+        if function == "BATTERY" and self.recalled["BATT"] in self.slots["BATT"]:
+            current = self.slots["BATT"][self.recalled["BATT"]][1]
+        elif function == "CV":
+            current = max(source - self.setpoints["VOLT"], 0.0) / resistance if resistance else 0.0
+        elif function == "CR":
+            current = source / (self.setpoints["RES"] + resistance) if self.setpoints["RES"] + resistance else 0.0
+        elif function == "CW":
+            # solve P = (source - I * resistance) * I for the smaller current
+            discriminant = source ** 2 - 4 * resistance * self.setpoints["POW"]
+            if resistance and discriminant >= 0:
+                current = (source - discriminant ** 0.5) / (2 * resistance)
+            elif resistance:
+                current = source / (2 * resistance)
+            else:
+                current = self.setpoints["POW"] / source if source else 0.0
+        elif function == "SHORt":
+            current = source / resistance if resistance else self.limits["CURR"]
+        elif function == "CC":
+            current = self.setpoints["CURR"]
+        else:
+            current = 0.0
+
+        current = min(current, self.limits["CURR"], source / resistance if resistance else current)
+        return max(source - current * resistance, 0.0), current
+
+    def _measure(self, name):
+        voltage, current = self._operating_point()
+        if name.startswith("VOLT"):
+            return _value(voltage, "V")
+        if name.startswith("CURR"):
+            return _value(current, "A")
+        if name.startswith("POW"):
+            return _value(voltage * current, "W")
+        return None
+
+    def _battery(self, parts, query, argument):
+        if len(parts) > 1:
+            elapsed = monotonic() - self._battery_start if self._battery_start is not None else 0.0
+            if parts[1].startswith("TIM"):
+                return "{0:.4f}M".format(elapsed / 60)
+            if parts[1].startswith("CAP"):
+                current = self._operating_point()[1]
+                return "{0:.4f}AH".format(current * elapsed / 3600)
+            return None
+        values = _numbers(argument)
+        self.slots["BATT"][int(values[0])] = values[1:]
+        return None
+
+    def _recall(self, name, query, argument):
+        name = "BATT" if name.startswith("BATT") else name
+        if name not in self.slots:
+            return None
+        if not query:
+            slot = int(argument)
+            self.recalled[name] = slot
+            if slot in self.slots[name]:
+                self.function = "BATTERY" if name == "BATT" else name
+            return None
+
+        values = self.slots[name].get(self.recalled[name])
+        if values is None:
+            return None
+        if name == "LIST" and values[-1] < 3:
+            # the firmware fails on lists looping fewer than 3 times just like on empty slots
+            return None
+        if name == "LIST":
+            steps = [", ".join([_field(values[i], "A"), _field(values[i + 1], "A/uS"), _field(values[i + 2], "S")])
+                     for i in range(2, 2 + int(values[1]) * 3, 3)]
+            return "{0},{1:02d},{2},{3:d}".format(_field(values[0], "A"), int(values[1]), ",".join(steps),
+                                                  int(values[-1]))
+        if name == "OCP":
+            units = ["V", "S", "A", "A", "A", "S", "A", "V", "A", "A"]
+        elif name == "OPP":
+            units = ["V", "S", "A", "W", "W", "S", "W", "V", "W", "W"]
+        else:
+            units = ["A", "A", "V", "AH", "M"]
+        return ",".join(_field(v, u) for v, u in zip(values, units))
@@ -0,0 +1,162 @@
+"""
+Continuous sampling of the measured values of a KEL103.
+
+The Sampler polls voltage, current and power as one batch of queries, either as fast as the link allows or at a set
+target rate, and hands out timestamped samples. Samples are written to a bounded ring buffer which can be
+filled from a background thread while the caller consumes them at its own pace.
+"""
+
+from collections import deque, namedtuple
+from time import monotonic, sleep
+import threading
+
+Sample = namedtuple("Sample", ["timestamp", "voltage", "current", "power"])
+Sample.__doc__ = """ A single measurement, timestamp is the time.monotonic() value in seconds taken before querying. """
+
+
+class Sampler(object):
+    """
+    Polls the ``:MEAS:*?`` queries of a load as one batch and yields timestamped samples.
+
+    The load must not be used from another thread while the sampler is running in the background.
+    """
+
+    def __init__(self, load, rate=None, buffer_size=10000, block=False):
+        """ Initialize sampler.
+
+        :param load: KELSerial instance to sample from
+        :param rate: target rate in samples per second, None samples as fast as possible
+        :param buffer_size: maximum number of samples kept in the ring buffer
+        :param block: when the buffer is full the background thread waits for the consumer instead of dropping the oldest sample
+        """
+        super(Sampler, self).__init__()
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be above 0")
+
+        self.load = load
+        self.rate = rate
+        self.block = block
+        self.buffer = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self.overruns = 0
+        self.count = 0
+        self._started = None
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def sample(self):
+        """ Take a single sample.
+
+        :rtype: Sample
+        """
+        timestamp = monotonic()
+        return Sample(timestamp, *self.load.query(":MEAS:VOLT?", ":MEAS:CURR?", ":MEAS:POW?"))
+
+    @property
+    def achieved_rate(self):
+        """ Average rate in samples per second since sampling started. """
+        if self._started is None or self.count == 0:
+            return None
+        elapsed = monotonic() - self._started
+        return self.count / elapsed if elapsed > 0 else None
+
+    def stream(self, count=None, duration=None):
+        """ Generator yielding samples at the target rate.
+
+        Every sample is also put into the ring buffer. If sampling falls behind the target rate the missed
+        ticks are skipped and counted as overruns instead of bursting to catch up.
+
+        :param count: stop after this many samples, None runs indefinitely
+        :param duration: stop after this many seconds, None runs indefinitely
+        """
+        interval = 1 / self.rate if self.rate else 0
+        start = monotonic()
+        if self._started is None:
+            self._started = start
+        next_tick = start
+        taken = 0
+
+        while count is None or taken < count:
+            if duration is not None and monotonic() - start >= duration:
+                return
+
+            if interval:
+                now = monotonic()
+                if next_tick > now:
+                    sleep(next_tick - now)
+                elif now - next_tick >= interval:
+                    missed = int((now - next_tick) / interval)
+                    self.overruns += missed
+                    next_tick += missed * interval
+                next_tick += interval
+
+            sample = self.sample()
+            self._put(sample)
+            taken += 1
+            yield sample
+
+    def __iter__(self):
+        return self.stream()
+
+    def _put(self, sample):
+        with self._condition:
+            if len(self.buffer) == self.buffer.maxlen:
+                if self.block:
+                    while self._running and len(self.buffer) == self.buffer.maxlen:
+                        self._condition.wait(0.1)
+                if len(self.buffer) == self.buffer.maxlen:
+                    self.dropped += 1
+            self.buffer.append(sample)
+            self.count += 1
+            self._condition.notify_all()
+
+    def read(self, max_count=None, timeout=None):
+        """ Take samples out of the ring buffer, oldest first.
+
+        :param max_count: maximum number of samples returned, None returns all buffered samples
+        :param timeout: seconds to wait for at least one sample if the buffer is empty, None does not wait
+        :rtype: list of Sample
+        """
+        with self._condition:
+            if not self.buffer and timeout:
+                self._condition.wait(timeout)
+            number = len(self.buffer) if max_count is None else min(max_count, len(self.buffer))
+            samples = [self.buffer.popleft() for _ in range(number)]
+            self._condition.notify_all()
+        return samples
+
+    def start(self):
+        """ Start sampling into the ring buffer from a background thread. """
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="kelctl-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for _ in self.stream():
+            if not self._running:
+                break
+
+    def stop(self):
+        """ Stop the background thread. Samples already in the ring buffer are kept. """
+        if self._thread is None:
+            return
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join()
+        self._thread = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, _type, value, traceback):
+        self.stop()
+        return False
@@ -0,0 +1,395 @@
+"""
+Transports KELSerial can talk to the load over.
+
+KELSerial uses a ``serial.Serial`` port by default, but accepts any object offering the same small subset of
+its interface: ``write(bytes)``, ``readline()``, ``reset_input_buffer()``, ``in_waiting``, ``timeout``,
+``open()``, ``close()`` and ``isOpen()``. Transports also offering ``read(size)`` are read from in bulk.
+"""
+
+import codecs
+import socket
+from datetime import datetime
+from time import monotonic, perf_counter, sleep
+from .kelerrors import *
+
+# The KEL103 listens on this port and sends its responses to the local port below
+DEFAULT_PORT = 18190
+DEFAULT_LOCAL_PORT = 18191
+
+
+class UDPTransport(object):
+    """
+    LAN transport sending SCPI commands to the load as UDP datagrams.
+
+    Every command is sent as one datagram, responses are buffered and handed out line by line. A query whose
+    response datagram got lost is sent again up to `retries` times, stale datagrams are dropped before a new
+    command so a late response can not be mistaken for the response to the next one. While queries written
+    back to back, like a pipelined batch, wait for their responses nothing is dropped, a lost response of such
+    a batch is not resent.
+    """
+
+    def __init__(self, host, port=DEFAULT_PORT, timeout=1, retries=1, local_port=DEFAULT_LOCAL_PORT):
+        """ Initialize and open transport.
+
+        :param host: IP address or hostname of the load
+        :param port: UDP port of the load, see ``Settings.port``
+        :param timeout: seconds to wait for every response line
+        :param retries: how often a query is resent when its response did not arrive
+        :param local_port: local UDP port the load sends its responses to, None for any free port
+        """
+        super(UDPTransport, self).__init__()
+        self.address = (host, port)
+        self.timeout = timeout
+        self.retries = retries
+        self.local_port = local_port
+        self.lost = 0
+        self._socket = None
+        self._buffer = bytearray()
+        self._last_query = None
+        # queries written since the last read, their responses may already be arriving
+        self._queries = 0
+        self.open()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """ Create transport from an url of the form ``udp://host[:port]``. """
+        address = url[len("udp://"):] if url.startswith("udp://") else url
+        host, _, port = address.partition(":")
+        return cls(host, int(port) if port else DEFAULT_PORT, **kwargs)
+
+    def open(self):
+        if self._socket is not None:
+            return
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(("", self.local_port or 0))
+        # a connected socket only receives datagrams from the load itself
+        self._socket.connect(self.address)
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        self._buffer.clear()
+
+    def isOpen(self):
+        return self._socket is not None
+
+    is_open = property(isOpen)
+
+    @property
+    def in_waiting(self):
+        self._drain()
+        return len(self._buffer)
+
+    def _drain(self):
+        """ Move all datagrams already received into the buffer without waiting. """
+        self._socket.setblocking(False)
+        try:
+            while True:
+                self._append(self._socket.recv(4096))
+        except (BlockingIOError, InterruptedError):
+            pass
+        except ConnectionRefusedError:
+            # ICMP port unreachable from an earlier datagram
+            pass
+        finally:
+            self._socket.setblocking(True)
+
+    def reset_input_buffer(self):
+        self._drain()
+        self._buffer.clear()
+
+    def write(self, data):
+        if not self._queries:
+            self.reset_input_buffer()
+        if data.rstrip().endswith(b"?"):
+            self._queries += 1
+            # resending the last query of a batch would not answer the one whose response got lost
+            self._last_query = data if self._queries == 1 else None
+        self._socket.send(data)
+        return len(data)
+
+    def _receive(self, deadline):
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            return False
+        self._socket.settimeout(remaining)
+        try:
+            datagram = self._socket.recv(4096)
+        except (socket.timeout, ConnectionRefusedError):
+            return False
+        finally:
+            self._socket.settimeout(None)
+
+        self._append(datagram)
+        self._last_query = None
+        return True
+
+    def _append(self, datagram):
+        # a datagram always holds a complete response, its last line may lack the terminator
+        self._buffer += datagram
+        if not datagram.endswith(b"\n"):
+            self._buffer += b"\n"
+
+    def readline(self):
+        self._queries = 0
+        attempts = self.retries
+        deadline = monotonic() + self.timeout
+        while True:
+            index = self._buffer.find(b"\n")
+            if index >= 0:
+                line = bytes(self._buffer[:index + 1])
+                del self._buffer[:index + 1]
+                return line
+            if self._receive(deadline):
+                continue
+
+            if self._last_query is None or attempts <= 0:
+                return b""
+
+            self.lost += 1
+            attempts -= 1
+            self._socket.send(self._last_query)
+            deadline = monotonic() + self.timeout
+
+    def read(self, size=1):
+        """ Read up to size bytes, waiting and resending a lost query like readline if nothing was received. """
+        self._queries = 0
+        if not self._buffer:
+            self._buffer[:0] = self.readline()
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+# event types of traffic logs
+SENT = ">"
+RECEIVED = "<"
+LOG_HEADER = "# kelctl traffic log v1"
+
+
+def _escape(data):
+    return data.decode("latin-1").encode("unicode_escape").decode("ascii")
+
+
+def _unescape(text):
+    return codecs.decode(text, "unicode_escape").encode("latin-1")
+
+
+def read_traffic_log(path):
+    """ Read a traffic log written by RecordingTransport.
+
+    :return: list of (seconds since recording started, SENT or RECEIVED, bytes) tuples
+    """
+    events = []
+    with open(path, "r", encoding="ascii") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            timestamp, direction, payload = line.split(" ", 2)
+            events.append((float(timestamp), direction, _unescape(payload)))
+    return events
+
+
+class RecordingTransport(object):
+    """
+    Transport wrapper appending everything written to and read from another transport to a traffic log.
+
+    Every line of the log holds the seconds since the recording started, ``>`` for sent or ``<`` for received
+    data and the data with newlines and other control characters escaped. A received line that is empty
+    is a read that timed out. Each recording session starts with a header line holding the wall clock time.
+    Data received through read() is logged line by line as well, a line cut off by a timeout is logged when
+    the read timed out. read() is only offered if the recorded transport offers it.
+    """
+
+    def __init__(self, port, path):
+        """ Initialize and open the log.
+
+        :param port: transport to record, i.e. a serial.Serial or UDPTransport
+        :param path: log file, appended to if it exists
+        """
+        super(RecordingTransport, self).__init__()
+        self.port = port
+        self.path = path
+        self._log = open(path, "a", encoding="ascii", buffering=1)
+        self._log.write("{0} {1}\n".format(LOG_HEADER, datetime.now().isoformat()))
+        self._start = perf_counter()
+        # received by read() but not logged yet, as the line is not complete
+        self._received = bytearray()
+        if hasattr(port, "read"):
+            self.read = self._read
+
+    def _record(self, direction, data):
+        self._log.write("{0:.6f} {1} {2}\n".format(perf_counter() - self._start, direction, _escape(data)))
+
+    def _record_received(self):
+        """ Log a line cut off, before it would be logged out of order or is dropped. """
+        if self._received:
+            self._record(RECEIVED, bytes(self._received))
+            self._received.clear()
+
+    @property
+    def timeout(self):
+        return self.port.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.port.timeout = value
+
+    def open(self):
+        self.port.open()
+        if self._log.closed:
+            self._log = open(self.path, "a", encoding="ascii", buffering=1)
+
+    def close(self):
+        self._record_received()
+        self.port.close()
+        self._log.close()
+
+    def isOpen(self):
+        return self.port.isOpen()
+
+    is_open = property(isOpen)
+
+    @property
+    def in_waiting(self):
+        return self.port.in_waiting
+
+    def reset_input_buffer(self):
+        self._record_received()
+        self.port.reset_input_buffer()
+
+    def write(self, data):
+        self._record_received()
+        self._record(SENT, data)
+        return self.port.write(data)
+
+    def readline(self):
+        self._record_received()
+        data = self.port.readline()
+        self._record(RECEIVED, data)
+        return data
+
+    def _read(self, size=1):
+        data = self.port.read(size)
+        if not data:
+            # a timeout, logged like a readline that timed out
+            self._record(RECEIVED, bytes(self._received))
+            self._received.clear()
+            return data
+        self._received += data
+        end = self._received.find(b"\n")
+        while end >= 0:
+            self._record(RECEIVED, bytes(self._received[:end + 1]))
+            del self._received[:end + 1]
+            end = self._received.find(b"\n")
+        return data
+
+
+class ReplayTransport(object):
+    """
+    Transport playing back a traffic log written by RecordingTransport.
+
+    Every write is matched against the next recorded command, received lines recorded after it are handed out
+    with their original delay divided by `speed`. Recorded lines that were not read before the next write are
+    skipped, so a session stays aligned even if fewer lines are read than during recording.
+    """
+
+    def __init__(self, path, speed=1.0, strict=True, timeout=1):
+        """ Initialize transport.
+
+        :param path: traffic log to play back
+        :param speed: factor to speed up the original timing, None to answer without delay
+        :param strict: raise a ReplayMismatchError if a written command differs from the recorded one
+        :param timeout: seconds a read waits when no recorded line is left
+        """
+        super(ReplayTransport, self).__init__()
+        self.speed = speed
+        self.strict = strict
+        self.timeout = timeout
+        self.mismatches = 0
+        self._events = read_traffic_log(path)
+        self._position = 0
+        self._written_at = perf_counter()
+        self._written_recorded = 0.0
+        # rest of a recorded chunk partially handed out by read()
+        self._pending = b""
+        self._open = True
+
+    @property
+    def remaining(self):
+        """ Number of recorded events not played back yet. """
+        return len(self._events) - self._position
+
+    def open(self):
+        self._open = True
+
+    def close(self):
+        self._open = False
+
+    def isOpen(self):
+        return self._open
+
+    is_open = property(isOpen)
+
+    def _ready_at(self, recorded):
+        if not self.speed:
+            return self._written_at
+        return self._written_at + (recorded - self._written_recorded) / self.speed
+
+    @property
+    def in_waiting(self):
+        waiting = len(self._pending)
+        now = perf_counter()
+        for timestamp, direction, data in self._events[self._position:]:
+            if direction != RECEIVED or self._ready_at(timestamp) > now:
+                break
+            waiting += len(data)
+        return waiting
+
+    def reset_input_buffer(self):
+        self._pending = b""
+
+    def write(self, data):
+        # lines not read during playback are dropped, like a flushed input buffer
+        self._pending = b""
+        while self._position < len(self._events) and self._events[self._position][1] != SENT:
+            self._position += 1
+        if self._position == len(self._events):
+            if self.strict:
+                raise ReplayMismatchError(None, data)
+            self.mismatches += 1
+            return len(data)
+
+        timestamp, _, recorded = self._events[self._position]
+        if recorded != data:
+            if self.strict:
+                raise ReplayMismatchError(recorded, data)
+            self.mismatches += 1
+        self._position += 1
+        self._written_at = perf_counter()
+        self._written_recorded = timestamp
+        return len(data)
+
+    def readline(self):
+        if self._position == len(self._events) or self._events[self._position][1] != RECEIVED:
+            sleep(self.timeout)
+            return b""
+        timestamp, _, data = self._events[self._position]
+        remaining = self._ready_at(timestamp) - perf_counter()
+        if remaining > 0:
+            sleep(remaining)
+        self._position += 1
+        return data
+
+    def read(self, size=1):
+        """ Read up to size bytes of recorded received data, a recorded chunk may be handed out in parts. """
+        if not self._pending:
+            self._pending = self.readline()
+        data = self._pending[:size]
+        self._pending = self._pending[size:]
+        return data
@@ -0,0 +1,37 @@
+import pytest
+
+from kelctl import *
+from kelctl import SimulatedKEL103
+
+# short timeouts, unanswered queries are part of most tests
+TIMEOUT = 0.05
+
+
+class FlakyKEL103(SimulatedKEL103):
+    """ Simulated load dropping or cutting off the next response to given commands. """
+
+    def __init__(self, **kwargs):
+        super(FlakyKEL103, self).__init__(**kwargs)
+        self.drop = []
+        self.cut = []
+
+    def _execute(self, line):
+        response = super(FlakyKEL103, self)._execute(line)
+        if line in self.drop:
+            self.drop.remove(line)
+            return None
+        if line in self.cut and response is not None:
+            self.cut.remove(line)
+            return response[:-2]
+        return response
+
+
+@pytest.fixture
+def sim():
+    return FlakyKEL103(timeout=TIMEOUT)
+
+
+@pytest.fixture
+def load(sim):
+    with KELSerial(sim, send_sleep_time=0, timeout=TIMEOUT) as load:
+        yield load
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from kelctl import *
+from kelctl import SimulatedKEL103, AsyncKELSerial
+
+
+async def connect(sim, delays=None):
+    """ Serve a simulated load on a local socket and connect an AsyncKELSerial to it.
+
+    Responses to the commands in delays are sent that many seconds late, once per listed delay.
+    """
+    delays = delays or {}
+
+    async def handle(reader, writer):
+        # closed even if the handler is cancelled as the event loop ends
+        try:
+            while line := await reader.readline():
+                sim.write(line)
+                # lets other coroutines run between commands, like a real link would
+                await asyncio.sleep(0.001)
+                response = b""
+                while sim.in_waiting:
+                    response += sim.readline()
+                if delays.get(line.decode().strip()):
+                    asyncio.get_running_loop().call_later(delays[line.decode().strip()].pop(0), writer.write, response)
+                else:
+                    writer.write(response)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+    return server, AsyncKELSerial(reader, writer, send_sleep_time=0, timeout=0.2)
+
+
+def test_concurrent_slot_reads_do_not_interleave():
+    async def main():
+        server, load = await connect(SimulatedKEL103())
+        async with server, load:
+            for slot in (1, 2, 3):
+                await load.set_ocp(OCPList(slot, 1, 1, 10, 5, 0.1 * slot, 1, 0.5, 1, 3, 2), recall=False)
+            ocps = await asyncio.gather(*[load.get_ocp(slot) for slot in (1, 2, 3, 1, 2, 3)])
+            assert [ocp.save_slot for ocp in ocps] == [1, 2, 3, 1, 2, 3]
+            assert [round(ocp.step_current, 1) for ocp in ocps] == [0.1, 0.2, 0.3, 0.1, 0.2, 0.3]
+            assert load.stats[":RCL:OCP?"].count == 6
+            with pytest.raises(ValueError):
+                await load.get_ocp(11)
+
+    asyncio.run(main())
+
+
+def test_set_list_rejects_lists_needing_several_slots():
+    async def main():
+        server, load = await connect(SimulatedKEL103())
+        async with server, load:
+            with pytest.raises(ValueError):
+                await load.set_list(LoadList(1, 10, [ListStep(1, 0.1, 1)] * 85, 3))
+
+    asyncio.run(main())
+
+
+def test_late_response_is_not_read_for_the_next_query():
+    async def main():
+        server, load = await connect(SimulatedKEL103(), {":MEAS:VOLT?": [0.25]})
+        async with server, load:
+            # the retry is answered in time, the late response arrives after it
+            assert await load.measured_voltage() == 12.0
+            await asyncio.sleep(0.1)
+            assert await load.function() is Mode.constant_current
+            assert await load.measured_voltage() == 12.0
+            assert load.stats[":MEAS:VOLT?"].timeouts == 1
+            assert load.stats[":FUNC?"].parse_failures >= 1
+
+    asyncio.run(main())
+
+
+def test_invalid_utf8_does_not_wedge_the_connection():
+    async def main():
+        sim = SimulatedKEL103()
+        sim._responses.append((0, b"\xff\xfe garbage\n"))
+        server, load = await connect(sim)
+        async with server, load:
+            assert [await load.measured_voltage() for _ in range(3)] == [12.0, 12.0, 12.0]
+            assert load.stats.resyncs == 1
+
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from kelctl import *
+from kelctl import BatteryMonitor, CUTOFF_VOLTAGE, CUTOFF_INPUT, CUTOFF_STOPPED
+
+BATT = BattList(1, 10, 2, 11.5, 0, 0)
+
+
+def test_voltage_cutoff_turns_input_off(sim, load):
+    monitor = BatteryMonitor(load, BATT, rate=200)
+    monitor.start()
+    assert sim.function == "BATTERY"
+
+    samples = []
+    for sample in monitor.run():
+        samples.append(sample)
+        if len(samples) == 3:
+            sim.source_voltage = 11.0
+    assert len(samples) == 4
+    assert monitor.cutoff == CUTOFF_VOLTAGE
+    assert load.input.get() is OnOffState.off
+    assert samples[0].current == 2.0
+    assert samples[-1].charge > 0
+    assert samples[-1].energy == pytest.approx(samples[-1].charge * 11.9, rel=0.1)
+
+
+def test_load_turning_input_off_ends_the_test(sim, load):
+    monitor = BatteryMonitor(load, BATT, rate=200)
+    monitor.start()
+    for count, sample in enumerate(monitor.run()):
+        if count == 1:
+            sim.input = False
+    assert monitor.cutoff == CUTOFF_INPUT
+
+
+def test_resume_from_checkpoint(tmp_path, sim, load):
+    path = str(tmp_path / "cell.jsonl")
+    monitor = BatteryMonitor(load, BATT, rate=200, checkpoint=path)
+    monitor.start()
+    list(monitor.run(duration=0.02))
+    assert monitor.samples
+
+    resumed = BatteryMonitor(load, BATT, rate=200, checkpoint=path)
+    assert resumed.resumed
+    assert resumed.samples == monitor.samples
+    assert resumed.charge == monitor.charge
+    sent = len(sim.received)
+    resumed.start()
+    assert sim.received[sent:] == []
+
+    resumed.stop()
+    assert BatteryMonitor(load, BATT, checkpoint=path).cutoff == CUTOFF_STOPPED
+    with pytest.raises(ValueError):
+        BatteryMonitor(load, BattList(1, 10, 3, 11.5, 0, 0), checkpoint=path)
+
+
+def test_resume_drops_record_cut_off_by_a_crash(tmp_path, load):
+    path = tmp_path / "cell.jsonl"
+    monitor = BatteryMonitor(load, BATT, rate=200, checkpoint=str(path))
+    monitor.start()
+    list(monitor.run(duration=0.02))
+    with open(path, "a") as f:
+        f.write(json.dumps(list(monitor.samples[-1]))[:20])
+
+    resumed = BatteryMonitor(load, BATT, rate=200, checkpoint=str(path))
+    assert resumed.samples == monitor.samples
+    list(resumed.run(duration=0.02))
+
+    assert BatteryMonitor(load, BATT, checkpoint=str(path)).samples == resumed.samples
+
+
+def test_cut_off_header_starts_the_test_again(tmp_path, sim, load):
+    path = tmp_path / "cell.jsonl"
+    path.write_text('{"batt_list": [1, 10')
+
+    monitor = BatteryMonitor(load, BATT, checkpoint=str(path))
+    assert not monitor.resumed
+    monitor.start()
+    assert sim.function == "BATTERY"
+    assert BatteryMonitor(load, BATT, checkpoint=str(path)).resumed
@@ -0,0 +1,61 @@
+import math
+
+import pytest
+
+from kelctl import *
+from kelctl import MeasurementBuffer
+
+
+@pytest.fixture(params=[False, True], ids=["array", "numpy"])
+def buffer(request):
+    if request.param:
+        pytest.importorskip("numpy")
+    buffer = MeasurementBuffer(capacity=2, use_numpy=request.param)
+    # one hour at 2 V, then one hour at 4 V, the current and power readings at 1 h went missing
+    for timestamp, voltage, current in [(0, 2, 1), (1800, 2, 1), (3600, 2, None), (5400, 4, 1), (7200, 4, 1)]:
+        buffer.append(Sample(timestamp, voltage, current, current and voltage * current))
+    return buffer
+
+
+def test_buffer_grows_and_keeps_columns(buffer):
+    assert len(buffer) == 5
+    assert list(buffer.column("voltage")) == [2, 2, 2, 4, 4]
+    assert list(buffer.column("timestamp", 1800, 5400)) == [1800, 3600, 5400]
+    assert math.isnan(buffer.column("current")[2])
+
+
+def test_statistics_leave_out_missing_values(buffer):
+    assert buffer.statistics("current") == Statistics(4, 1.0, 1.0, 1.0, 1.0)
+    voltage = buffer.statistics("voltage", start=3600)
+    assert voltage.count == 3
+    assert voltage.mean == pytest.approx(10 / 3)
+    assert voltage.rms == pytest.approx(math.sqrt(36 / 3))
+    assert buffer.statistics("voltage", start=8000) == Statistics(0, None, None, None, None)
+
+
+def test_integrals_skip_intervals_with_missing_values(buffer):
+    # the two half hours around the missing current are skipped
+    assert buffer.charge() == pytest.approx(1.0)
+    assert buffer.energy(end=3600) == pytest.approx(1.0)
+
+    summary = buffer.summary(start=5400)
+    assert (summary.count, summary.duration) == (2, 1800.0)
+    assert summary.energy == pytest.approx(2.0)
+    assert summary.voltage.max == 4.0
+
+
+def test_clear_and_extend(buffer):
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer.summary().count == 0
+
+    buffer.extend([(0, 1, 1, 1), (3600, 1, 1, 1)])
+    assert buffer.energy() == pytest.approx(1.0)
+
+
+def test_numpy_can_not_be_forced_without_numpy(monkeypatch):
+    from kelctl import kelbuffer
+    monkeypatch.setattr(kelbuffer, "numpy", None)
+    assert not MeasurementBuffer().use_numpy
+    with pytest.raises(ImportError):
+        MeasurementBuffer(use_numpy=True)
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from kelctl import *
+from kelctl import apply_config, load_config, read_config
+
+CONFIG = {
+    "settings": {"beep": False, "lock": False, "port": 18191},
+    "limits": {"current": 20, "voltage": 60},
+    "ocp": {"2": {"on_voltage": 1, "on_delay": 1, "current_range": 10, "initial_current": 5, "step_current": 0.1,
+                  "step_delay": 1, "off_current": 0.5, "ocp_voltage": 1, "max_overcurrent": 3,
+                  "min_overcurrent": 2}},
+    "lists": {"1": {"current_range": 10, "steps": [[1, 0.1, 2], [2, 0.1, 2]], "loop_number": 3}},
+    "function": "CV",
+    "setpoints": {"voltage": 5, "current": 1},
+    "input": False,
+}
+
+
+def writes(sim, start=0):
+    """ Every command sent that is not a query. """
+    return [command for command in sim.received[start:] if not command.endswith("?")]
+
+
+def test_apply_config(load):
+    changes = apply_config(load, CONFIG)
+    assert ("settings", "beep") in changes
+    assert ("ocp", "2") in changes
+    assert ("input", None) not in changes
+
+    assert load.settings.beep.get() is OnOffState.off
+    assert load.settings.port == 18191
+    assert load.settings.current_limit == 20.0
+    assert load.get_ocp(2).step_current == 0.1
+    assert load.voltage == 5.0
+    assert load.current == 1.0
+
+
+def test_apply_config_twice_writes_nothing(sim, load):
+    apply_config(load, CONFIG)
+    start = len(sim.received)
+
+    assert apply_config(load, CONFIG) == {}
+    assert writes(sim, start) == []
+    assert len(sim.received) - start == 9
+
+
+def test_apply_config_reads_only_uncached_slots(sim, load):
+    apply_config(load, CONFIG)
+    load.invalidate_slots("ocp")
+    start = len(sim.received)
+
+    assert apply_config(load, CONFIG) == {}
+    assert writes(sim, start) == [":RCL:OCP 2", ":FUNC CV", ":VOLT 5.0000V"]
+    start = len(sim.received)
+
+    assert apply_config(load, CONFIG, refresh=True) == {}
+    assert writes(sim, start) == [":RCL:LIST 1", ":RCL:OCP 2", ":FUNC CV", ":VOLT 5.0000V"]
+
+
+def test_function_is_set_after_setpoints(load):
+    apply_config(load, {"function": "CV", "setpoints": {"voltage": 5, "current": 1}})
+    assert load.function is Mode.constant_voltage
+
+    apply_config(load, {"function": "CV", "setpoints": {"current": 2}})
+    assert load.function is Mode.constant_voltage
+
+    apply_config(load, {"setpoints": {"resistance": 3}})
+    assert load.function is Mode.constant_voltage
+
+
+def test_unknown_keys_are_rejected_before_reading(sim, load):
+    for config in ({"settings": {"beeep": False}}, {"limit": {"current": 1}}, {"setpoints": {"amps": 1}},
+                   {"function": "LIST", "setpoints": {"current": 2}}, {"function": "CX"}, {"input": "maybe"}):
+        with pytest.raises(ValueError):
+            apply_config(load, config)
+    assert sim.received == []
+
+
+def test_invalid_slot_is_rejected_before_writing(sim, load):
+    config = {"settings": {"beep": False}, "batt": {"1": {"current_range": 1, "discharge_current": 2,
+                                                          "cutoff_voltage": 3, "cutoff_capacity": 1,
+                                                          "cutoff_time": 10}}}
+    with pytest.raises(ValueError):
+        apply_config(load, config)
+    assert sim.received == []
+    assert load.settings.beep.get() is OnOffState.on
+
+
+def test_read_config(load):
+    current = read_config(load)
+    assert current["settings"]["baudrate"] is BaudRate.R115200
+    assert current["limits"]["power"] == 300.0
+    assert current["function"] is Mode.constant_current
+
+
+def test_load_config(tmp_path):
+    path = tmp_path / "bench.json"
+    path.write_text(json.dumps(CONFIG))
+    assert load_config(str(path)) == CONFIG
+
+    path = tmp_path / "bench.toml"
+    path.write_text('function = "CC"\n[setpoints]\ncurrent = 1.5\n[lists.1]\ncurrent_range = 10\n'
+                    'steps = [[1, 0.1, 2], [2, 0.1, 2]]\n')
+    assert load_config(str(path)) == {"function": "CC", "setpoints": {"current": 1.5},
+                                      "lists": {"1": {"current_range": 10, "steps": [[1, 0.1, 2], [2, 0.1, 2]]}}}
@@ -0,0 +1,70 @@
+import pytest
+
+from kelctl import *
+
+
+def test_tokenize_splits_numbers_and_units():
+    assert tokenize(" 3.000A, 0.010A/uS,5S,4") == [("3.000", "A"), ("0.010", "A/uS"), ("5", "S"), ("4", "")]
+    assert tokenize("11.000AH,30.000M") == [("11.000", "AH"), ("30.000", "M")]
+
+
+def test_parse_list():
+    response = "20.000A,03, 3.000A, 0.010A/uS, 5.000S, 7.000A, 0.020A/uS, 9.000S, 9.000A, 0.050A/uS, 6.000S,4"
+    load_list = parse_list(5, response)
+
+    assert load_list == LoadList(5, 20, [ListStep(3, 0.01, 5), ListStep(7, 0.02, 9), ListStep(9, 0.05, 6)], 4)
+    assert load_list.loop_number == 4
+    assert [step.duration for step in load_list.steps] == [5.0, 9.0, 6.0]
+
+
+def test_parse_slots():
+    ocp = parse_ocp(2, " 1.000V, 1.000S,10.000A, 5.000A, 0.100A, 1.000S, 0.500A, 1.000V, 3.000A, 2.000A")
+    assert ocp == OCPList(2, 1, 1, 10, 5, 0.1, 1, 0.5, 1, 3, 2)
+
+    opp = parse_opp(3, " 1.000V, 1.000S,10.000A,50.000W, 1.000W, 1.000S, 5.000W, 1.000V,30.000W,20.000W")
+    assert opp == OPPList(3, 1, 1, 10, 50, 1, 1, 5, 1, 30, 20)
+
+    batt = parse_batt(1, "30.000A, 7.000A,35.000V,11.000AH,30.000M")
+    assert batt == BattList(1, 30, 7, 35, 11, 30)
+
+
+# responses as documented in KEL103-protocol.md
+@pytest.mark.parametrize("response, expected", [
+    ("1, 5.000V, 5.500V, 0.200HZ,70.000%", CVList(5, 5.5, 0.2, 70)),
+    ("2, 0.001A/uS, 0.100A/uS, 1.000A, 2.000A, 0.100HZ,70.000%", CCList(0.001, 0.1, 1, 2, 0.1, 70)),
+    ("3,10.000OHM,20.000OHM, 0.100HZ,70.000%", CRList(10, 20, 0.1, 70)),
+    ("4,10.000W,20.000W, 0.100HZ,70.000%", CWList(10, 20, 0.1, 70)),
+    ("5, 0.100A/uS, 0.001A/uS, 1.000A, 3.000A,10.000S", PulseList(0.1, 0.001, 1, 3, 10)),
+    ("6, 0.100A/uS, 0.001A/uS, 3.000A, 1.000A", ToggleList(0.1, 0.001, 3, 1)),
+])
+def test_parse_dynamic_mode(response, expected):
+    decoded = parse_dynamic_mode(response)
+
+    assert type(decoded) is type(expected)
+    assert vars(decoded) == vars(expected)
+
+
+@pytest.mark.parametrize("response", [
+    "",
+    "20.000A,03, 3.000A, 0.010A/uS, 5.000S,4",
+    "20.000A,01, 3.000V, 0.010A/uS, 5.000S,4",
+    "20.000A,01, 3.000A, 0.010A/uS, 5.000S,",
+    "20.000A,01, 3.000A, garbage, 5.000S,4",
+])
+def test_parse_list_rejects_malformed_responses(response):
+    with pytest.raises(ResponseFormatError):
+        parse_list(1, response)
+
+
+def test_parse_slot_rejects_wrong_units():
+    with pytest.raises(ResponseFormatError):
+        parse_batt(1, "30.000A, 7.000A,35.000V,11.000A,30.000M")
+    with pytest.raises(ValueError):
+        parse_ocp(1, "")
+
+
+def test_parse_dynamic_mode_rejects_unknown_modes():
+    with pytest.raises(InvalidModeError):
+        parse_dynamic_mode("7,1.000V")
+    with pytest.raises(ResponseFormatError):
+        parse_dynamic_mode("1, 1.000V, 2.000V,10.000HZ")
@@ -0,0 +1,47 @@
+import pytest
+
+from kelctl import *
+from kelctl import SimulatedKEL103, KELPool
+
+
+class BrokenKEL103(SimulatedKEL103):
+    """ Simulated load whose link fails on every write. """
+
+    def write(self, data):
+        raise OSError("link down")
+
+
+@pytest.fixture
+def pool():
+    loads = {"a": KELSerial(SimulatedKEL103(), send_sleep_time=0),
+             "b": KELSerial(SimulatedKEL103(source_voltage=5), send_sleep_time=0),
+             "broken": KELSerial(BrokenKEL103(), send_sleep_time=0)}
+    with KELPool(loads) as pool:
+        yield pool
+
+
+def test_failing_load_does_not_affect_the_others(pool):
+    results = pool.set("current", 1.5)
+    assert list(results) == ["a", "b"]
+    assert not results.ok
+    assert isinstance(results.errors["broken"], OSError)
+    with pytest.raises(OSError):
+        results.raise_errors()
+
+    results = pool.get("current", keys=["a", "b"])
+    assert results.ok
+    assert results == {"a": 1.5, "b": 1.5}
+
+
+def test_measure_all_loads(pool):
+    results = pool.measure()
+    assert results["a"].voltage == 12.0
+    assert results["b"].voltage == 5.0
+    assert list(results.errors) == ["broken"]
+
+
+def test_ports_failing_to_open_are_reported():
+    with KELPool([SimulatedKEL103(), "/nonexistent/ttyKEL"], send_sleep_time=0) as pool:
+        assert list(pool.loads) == [0]
+        assert list(pool.failed) == ["/nonexistent/ttyKEL"]
+        assert pool.run(lambda load: load.model)[0] == SimulatedKEL103().model
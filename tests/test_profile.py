@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+from kelctl import *
+from kelctl import ProfilePlayer
+
+
+def writes(sim, start=0):
+    return [command for command in sim.received[start:] if not command.endswith("?")]
+
+
+def test_play_writes_every_step_on_schedule(sim, load):
+    player = ProfilePlayer(load, "voltage", [(0.01, 5), (0.01, 6), (0.02, 7)])
+    report = player.play()
+
+    assert writes(sim) == [":FUNC CV", ":VOLT 5.0000V", ":VOLT 6.0000V", ":VOLT 7.0000V"]
+    assert [timing.scheduled for timing in player.timings] == pytest.approx([0.0, 0.01, 0.02])
+    assert all(0 <= timing.jitter < 0.01 for timing in player.timings)
+    assert (report.steps, report.duration) == (3, pytest.approx(0.04))
+    assert 0 <= report.drift < 0.01
+
+
+def test_jitter_includes_the_pacer_wait(load):
+    load.pacer.gap = 0.02
+    player = ProfilePlayer(load, "current", [1, 2, 3], interval=0.005)
+    report = player.play(set_function=False)
+
+    assert report.max_jitter >= 0.02
+    written = [timing.written for timing in player.timings]
+    assert all(later - earlier >= 0.02 for earlier, later in zip(written, written[1:]))
+
+
+def test_profile_is_checked_against_the_limit_before_writing(sim, load):
+    player = ProfilePlayer(load, "current", [1, 31, 2], interval=0.01)
+    with pytest.raises(ValueOutOfLimitError):
+        player.play()
+    assert writes(sim) == []
+
+    with pytest.raises(ValueError):
+        ProfilePlayer(load, "amps", [1], interval=1)
+
+
+def test_from_csv_skips_rows_without_numbers(tmp_path, load):
+    path = tmp_path / "profile.csv"
+    path.write_text("duration,current\n0.5,1\n\n1.5,2\n")
+    assert ProfilePlayer.from_csv(load, "current", str(path)).steps == [(0.5, 1.0), (1.5, 2.0)]
+
+    path.write_text("current\n1\n2\n3\n")
+    player = ProfilePlayer.from_csv(load, "current", str(path), interval=0.1)
+    assert player.steps == [(0.1, 1.0), (0.1, 2.0), (0.1, 3.0)]
+    assert player.duration == pytest.approx(0.3)
+
+
+def test_stop_ends_playback(sim, load):
+    player = ProfilePlayer(load, "current", [1, 2, 3], interval=1)
+    threading.Timer(0.05, player.stop).start()
+    report = player.play()
+
+    assert report.steps == 1
+    assert writes(sim)[-1] == ":CURR 1.0000A"
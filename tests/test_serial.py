@@ -0,0 +1,210 @@
+from time import monotonic
+
+import pytest
+
+from kelctl import *
+from kelctl import SimulatedKEL103, read_traffic_log, RECEIVED
+
+
+class LineTransport(object):
+    """ Simulated load without read(), so responses are read line by line. """
+
+    def __init__(self, sim):
+        self.sim = sim
+
+    def __getattr__(self, name):
+        if name == "read":
+            raise AttributeError(name)
+        return getattr(self.sim, name)
+
+
+class SerialLink(object):
+    """ Serial port to a simulated load, the load only understands what is written at its own baud rate. """
+
+    def __init__(self, sim, baudrate=115200):
+        self.sim = sim
+        self.baudrate = baudrate
+
+    @property
+    def timeout(self):
+        return self.sim.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.sim.timeout = value
+
+    def write(self, data):
+        if self.baudrate != self.sim.baudrate:
+            return len(data)
+        return self.sim.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.sim, name)
+
+
+@pytest.fixture(params=["bulk", "lines"])
+def sim_load(request):
+    sim = SimulatedKEL103(timeout=0.05)
+    port = sim if request.param == "bulk" else LineTransport(sim)
+    with KELSerial(port, send_sleep_time=0, timeout=0.05) as load:
+        yield sim, load
+
+
+def test_invalid_utf8_does_not_wedge_the_connection(sim_load):
+    sim, load = sim_load
+    sim._responses.append((monotonic(), b"\xff\xfe garbage\n"))
+
+    assert [load.measured_voltage for _ in range(3)] == [12.0, 12.0, 12.0]
+    assert load.stats.resyncs == 1
+
+
+def test_recording_logs_whole_lines(tmp_path):
+    path = tmp_path / "traffic.log"
+    with KELSerial(SimulatedKEL103(), send_sleep_time=0, record=str(path)) as load:
+        load.measured_voltage
+        info = load.device_info
+        load.query(":MEAS:VOLT?", ":MEAS:CURR?")
+
+    received = [data for _, direction, data in read_traffic_log(str(path)) if direction == RECEIVED]
+    assert received[0] == b"12.000V\n"
+    assert received[1:8] == [line.encode() + b"\n" for line in info.split("\n")]
+    assert received[8:] == [b"12.000V\n", b"0.0000A\n"]
+    assert all(data.endswith(b"\n") for data in received)
+
+
+def test_query_decodes_a_batch(load):
+    assert load.query(":MEAS:VOLT?", ":FUNC?", ":INP?", ":SYST:BAUD?") == [
+        12.0, Mode.constant_current, OnOffState.off, BaudRate.R115200]
+    assert load.query(":MEAS:VOLT?", ":CURR:UPP?", joined=True) == [12.0, 30.0]
+
+
+def test_empty_query_sends_nothing(sim, load):
+    assert load.query() == []
+    assert sim.received == []
+
+
+def test_query_keeps_batch_aligned_when_a_response_is_dropped(sim, load):
+    sim.drop.append(":CURR:UPP?")
+    assert load.query(":MEAS:VOLT?", ":CURR:UPP?", ":FUNC?", retry=False) == [12.0, None, Mode.constant_current]
+    assert load.stats.resyncs == 1
+
+    sim.drop.append(":CURR:UPP?")
+    assert load.query(":MEAS:VOLT?", ":CURR:UPP?", ":FUNC?") == [12.0, 30.0, Mode.constant_current]
+
+
+def test_cut_off_response_is_retried(sim, load):
+    sim.cut.append(":MEAS:VOLT?")
+    assert load.measured_voltage == 12.0
+    assert load.stats[":MEAS:VOLT?"].parse_failures == 1
+    assert load.stats.resyncs == 1
+    assert load.measured_current == 0.0
+
+
+def test_timed_out_response_is_retried(sim, load):
+    sim.drop.append(":MEAS:VOLT?")
+    assert load.measured_voltage == 12.0
+    assert load.stats[":MEAS:VOLT?"].timeouts == 1
+
+
+def test_retries_can_be_disabled(sim, load):
+    load.retries = 0
+    sim.cut.append(":MEAS:VOLT?")
+    assert load.measured_voltage is None
+    assert load.measured_voltage == 12.0
+
+
+def test_unanswered_slot_query_is_not_retried(sim, load):
+    with pytest.raises(ResponseFormatError):
+        load.get_ocp(5)
+    assert sim.received.count(":RCL:OCP?") == 1
+
+
+def test_device_info_stops_at_its_last_line(load):
+    start = monotonic()
+    info = load.device_info
+    assert monotonic() - start < 0.05
+    assert info.splitlines()[0] == "DHCP:0"
+    assert info.splitlines()[-1] == "BAUDRATE:115200"
+
+
+def test_adaptive_pacing_only_shrinks_on_answered_queries(sim):
+    with KELSerial(sim, adaptive_pacing=True, timeout=0.05) as load:
+        load.pacer.gap = 0.01
+        load.pacer.window = 5
+        for _ in range(10):
+            load.current = 0.1
+        assert load.pacer.gap == 0.01
+
+        for _ in range(5):
+            load.measured_voltage
+        assert load.pacer.gap < 0.01
+
+
+def test_snapshot_reads_state_and_caches_limits(sim, load):
+    load.function = Mode.constant_voltage
+    load.settings.voltage_limit = 60
+    load.voltage = 5
+    load.input.on()
+    load.settings.invalidate_limits()
+
+    snapshot = load.snapshot()
+    assert snapshot.function is Mode.constant_voltage
+    assert snapshot.input is OnOffState.on
+    assert (snapshot.voltage, snapshot.voltage_limit, snapshot.power_limit) == (5.0, 60.0, 300.0)
+    assert snapshot.status.beep is OnOffState.on
+
+    sent = len(sim.received)
+    assert load.settings.cached_limit("current") == 30.0
+    assert sim.received[sent:] == []
+
+
+def test_recording_a_transport_without_read(tmp_path):
+    path = tmp_path / "traffic.log"
+    with KELSerial(LineTransport(SimulatedKEL103()), send_sleep_time=0, record=str(path)) as load:
+        assert load.query(":MEAS:VOLT?", ":FUNC?") == [12.0, Mode.constant_current]
+
+    received = [data for _, direction, data in read_traffic_log(str(path)) if direction == RECEIVED]
+    assert received == [b"12.000V\n", b"CC\n"]
+
+
+def test_detect_baudrate_leaves_the_port_at_the_found_rate():
+    sim = SimulatedKEL103(timeout=1)
+    sim.baudrate = 19200
+    port = SerialLink(sim)
+
+    assert detect_baudrate(port, timeout=0.01) is BaudRate.R19200
+    assert (port.baudrate, port.timeout) == (19200, 1)
+    assert sim.received == ["*IDN?"]
+
+    sim.baudrate = 4800
+    with pytest.raises(BaudRateNotDetectedError):
+        detect_baudrate(port, timeout=0.01)
+    assert port.timeout == 1
+
+
+def test_auto_connect_sets_the_constructor_timeout():
+    sim = SimulatedKEL103(timeout=1)
+    sim.baudrate = 9600
+    port = SerialLink(sim)
+
+    with KELSerial.auto_connect(port, probe_timeout=0.01, send_sleep_time=0, timeout=0.05) as load:
+        assert (port.baudrate, port.timeout) == (9600, 0.05)
+        assert load.model == sim.model
+
+
+def test_auto_connect_upgrades_a_slow_load():
+    sim = SimulatedKEL103(timeout=0.05)
+    sim.baudrate = 9600
+    port = SerialLink(sim)
+
+    with KELSerial.auto_connect(port, upgrade=True, probe_timeout=0.01, send_sleep_time=0) as load:
+        assert sim.baudrate == port.baudrate == 115200
+        assert load.settings.baudrate is BaudRate.R115200
+
+
+def test_auto_connect_closes_the_port_without_a_load():
+    sim = SimulatedKEL103(timeout=0.05)
+    sim.baudrate = 4800
+    with pytest.raises(BaudRateNotDetectedError):
+        KELSerial.auto_connect(SerialLink(sim), probe_timeout=0.01)
+    assert not sim.is_open
@@ -0,0 +1,170 @@
+from time import monotonic, sleep
+
+import pytest
+
+from kelctl import *
+from kelctl import SimulatedKEL103, slot_fields
+
+
+def steps(count, duration=1):
+    return [ListStep(1 + index % 5, 0.1, duration) for index in range(count)]
+
+
+OCP = OCPList(2, 1, 1, 10, 5, 0.1, 1, 0.5, 1, 3, 2)
+BATT = BattList(3, 10, 1, 3, 1, 10)
+
+
+def test_get_serves_set_slots_from_cache(sim, load):
+    load.set_ocp(OCP, recall=False)
+    sent = len(sim.received)
+
+    ocp = load.get_ocp(2)
+    assert ocp == OCP
+    assert ocp is not OCP
+    assert len(sim.received) == sent
+
+
+def test_cached_slots_are_copies(load):
+    load_list = LoadList(1, 10, steps(3), 3)
+    load.set_list(load_list, recall=False)
+
+    load.get_list(1).steps[0].current = 9
+    load_list.steps[1].current = 9
+    assert load.get_list(1) == LoadList(1, 10, steps(3), 3)
+
+
+def test_invalidated_slots_are_read_from_device(sim, load):
+    load.set_ocp(OCP, recall=False)
+    load.set_batt(BATT, recall=False)
+    load.invalidate_slots("ocp")
+
+    sent = len(sim.received)
+    assert load.get_ocp(2) == OCP
+    assert load.get_batt(3) == BATT
+    assert sim.received[sent:] == [":RCL:OCP 2", ":RCL:OCP?"]
+
+
+def test_factoryreset_clears_slot_cache(load):
+    load.set_ocp(OCP, recall=False)
+    load.settings.factoryreset()
+    with pytest.raises(ResponseFormatError):
+        load.get_ocp(2)
+
+
+def test_slot_numbers_out_of_range_are_refused(sim, load):
+    sent = len(sim.received)
+    for method, highest in [(load.get_list, 7), (load.recall_list, 7), (load.get_ocp, 10), (load.recall_ocp, 10),
+                            (load.get_opp, 10), (load.recall_opp, 10), (load.get_batt, 10), (load.recall_batt, 10)]:
+        for slot in [0, highest + 1]:
+            with pytest.raises(ValueError):
+                method(slot)
+    assert sim.received[sent:] == []
+
+
+def test_list_objects_compare_and_hash_by_command():
+    assert LoadList(1, 10, steps(3), 3) == LoadList(1, 10, steps(3), 3)
+    assert LoadList(1, 10, steps(3), 3) != LoadList(1, 10, steps(3), 4)
+    assert len({BATT, BattList(3, 10, 1, 3, 1, 10), OCP}) == 2
+
+
+def test_dump_slots_reads_all_stored_slots(load):
+    load.set_ocp(OCP, recall=False)
+    load.set_batt(BATT, recall=False)
+    load.set_list(LoadList(4, 10, steps(5), 3), recall=False)
+    load.invalidate_slots()
+
+    document = load.dump_slots()
+    assert set(document) == {"lists", "ocp", "batt"}
+    assert list(document["ocp"]) == ["2"]
+    assert document["lists"]["4"]["steps"][1] == [2.0, 0.1, 1.0]
+    assert document["batt"]["3"]["cutoff_time"] == 10.0
+    assert load.restore_slots(document) == {}
+
+
+def test_dump_slots_restores_the_function(load):
+    load.set_ocp(OCP, recall=False)
+    load.settings.refresh_limits()
+    load.function = Mode.constant_voltage
+    load.voltage = 5
+
+    load.dump_slots({"ocp": [2]})
+    assert load.function is Mode.constant_voltage
+    assert load.voltage == 5.0
+
+    load.set_dynamic_mode(CCList(0.1, 0.1, 1, 2, 10, 50))
+    load.dump_slots({"ocp": [2]})
+    assert load.function is Mode.dynamic_cc
+
+
+def test_dump_slots_refuses_to_recall_with_input_on(sim, load):
+    load.set_ocp(OCP, recall=False)
+    load.input.on()
+    load.invalidate_slots()
+    sent = len(sim.received)
+
+    with pytest.raises(InputOnError):
+        load.dump_slots({"ocp": [2]})
+    assert sim.received[sent:] == [":INP?"]
+
+    load.set_ocp(OCP, recall=False)
+    assert load.dump_slots({"ocp": [2]}, cached=True) == {"ocp": {"2": slot_fields(OCP)}}
+    assert load.input.get() is OnOffState.on
+    assert load.function is Mode.constant_current
+
+
+def test_long_list_is_split_into_readable_slots(load):
+    load_list = LoadList(2, 10, steps(200), 1)
+    load.set_list(load_list, recall=False)
+    load.invalidate_slots()
+
+    parts = [load.get_list(slot) for slot in (2, 3, 4)]
+    assert [len(part.steps) for part in parts] == [67, 67, 66]
+    assert all(part.loop_number == MIN_LIST_LOOPS for part in parts)
+    read_back = [(step.current, step.duration) for part in parts for step in part.steps]
+    assert read_back == [(step.current, step.duration) for step in load_list.steps]
+
+
+def test_list_validation():
+    with pytest.raises(ValueError):
+        LoadList(6, 10, steps(200), 1).validate()
+    with pytest.raises(ValueError):
+        LoadList(1, 10, steps(85), 3).validate(chained=False)
+    LoadList(1, 10, steps(84), 3).validate(chained=False)
+    LoadList(5, 10, steps(252), 1).validate()
+
+
+def test_list_chain_switches_slots_and_ends_with_input_off(sim, load):
+    chain = load.set_list(LoadList(1, 10, steps(100, 0.005), 1))
+    assert sim.received[-1] == ":RCL:LIST 1"
+
+    load.input.on()
+    chain.start()
+    chain.wait()
+    assert sim.received[-2:] == [":RCL:LIST 2", ":INP OFF"]
+    assert load.input.get() is OnOffState.off
+
+
+class SlowKEL103(SimulatedKEL103):
+    """ Simulated load on a link where every write takes `delay` seconds, write times are kept in `written`. """
+
+    def __init__(self, delay, **kwargs):
+        super(SlowKEL103, self).__init__(**kwargs)
+        self.delay = delay
+        self.written = {}
+
+    def write(self, data):
+        sleep(self.delay)
+        self.written[data] = monotonic()
+        return super(SlowKEL103, self).write(data)
+
+
+def test_list_chain_sends_recalls_ahead_by_their_write_time():
+    sim = SlowKEL103(0.02)
+    with KELSerial(sim, send_sleep_time=0) as load:
+        chain = load.set_list(LoadList(1, 10, steps(100, 0.005), 1))
+        chain.start(input_on=True)
+        chain.wait()
+
+    switched = sim.written[b":RCL:LIST 2\n"] - sim.written[b":INP ON\n"]
+    assert switched == pytest.approx(chain.durations[0], abs=0.01)
+    assert sim.written[b":INP OFF\n"] - sim.written[b":INP ON\n"] == pytest.approx(chain.duration, abs=0.01)
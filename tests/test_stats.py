@@ -0,0 +1,69 @@
+from kelctl import *
+
+
+def test_commands_are_counted_by_name(load):
+    load.settings.refresh_limits()
+    load.stats.reset()
+    load.current = 1.5
+    load.current = 2
+    assert load.measured_voltage == 12.0
+
+    stats = load.stats[":CURR"]
+    assert (stats.count, stats.failures, stats.bytes_sent, stats.bytes_received) == (2, 0, 28, 0)
+    assert stats.response_latency.count == 0
+
+    stats = load.stats[":MEAS:VOLT?"]
+    assert (stats.count, stats.bytes_sent, stats.bytes_received) == (1, 12, 8)
+    assert stats.response_latency.count == 1
+    assert stats.min == stats.max == stats.last == stats.mean == stats.total
+    assert stats.mean >= stats.response_latency.mean
+
+    totals = load.stats.totals
+    assert (totals.count, totals.bytes_sent, totals.bytes_received) == (3, 40, 8)
+
+
+def test_timeouts_and_parse_failures_count_as_failures(sim, load):
+    sim.drop.append(":MEAS:VOLT?")
+    sim.cut.append(":FUNC?")
+    load.retries = 0
+    assert load.measured_voltage is None
+    assert load.function is None
+
+    assert (load.stats[":MEAS:VOLT?"].timeouts, load.stats[":MEAS:VOLT?"].failures) == (1, 1)
+    assert load.stats[":FUNC?"].parse_failures == 1
+    assert load.stats.totals.failures == 2
+    assert load.stats.resyncs == 2
+
+
+def test_callbacks_receive_every_command(load):
+    load.settings.refresh_limits()
+    events = []
+    load.stats.add_callback(events.append)
+    load.current = 1
+    load.query(":MEAS:VOLT?", ":FUNC?")
+    load.stats.remove_callback(events.append)
+    load.measured_current
+
+    assert [event.command for event in events] == [":CURR 1.0000A", ":MEAS:VOLT?", ":FUNC?"]
+    assert events[0].response_latency is None
+    assert all(event.response_latency > 0 for event in events[1:])
+    assert not any(event.timeout or event.parse_failure for event in events)
+
+
+def test_reset_clears_stats(load):
+    load.measured_voltage
+    load.stats.reset()
+    assert load.stats.commands == {}
+    assert load.stats.totals.count == 0
+
+
+def test_histogram_percentiles():
+    histogram = KELSerial.Histogram()
+    for value in [0.0004] * 90 + [0.003] * 9 + [3.0]:
+        histogram.add(value)
+
+    assert histogram.percentile(50) == 0.0005
+    assert histogram.percentile(99) == 0.005
+    assert histogram.percentile(100) == 3.0
+    assert histogram.counts[-1] == 1
+    assert KELSerial.Histogram().percentile(50) is None
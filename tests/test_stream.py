@@ -0,0 +1,46 @@
+import time
+
+from kelctl import *
+from kelctl import SimulatedKEL103
+
+
+def test_stream_keeps_target_rate(load):
+    sampler = Sampler(load, rate=100)
+    samples = list(sampler.stream(count=5))
+
+    assert [sample[1:] for sample in samples] == [(12.0, 0.0, 0.0)] * 5
+    # ticks are fixed, a late sample is followed by a shorter gap
+    assert samples[-1].timestamp - samples[0].timestamp > 0.035
+    assert sampler.overruns == 0
+    assert len(sampler.buffer) == 5
+
+
+def test_stream_skips_missed_ticks():
+    with KELSerial(SimulatedKEL103(latency=0.005), send_sleep_time=0) as load:
+        sampler = Sampler(load, rate=1000)
+        samples = list(sampler.stream(count=5))
+
+    assert len(samples) == 5
+    assert sampler.overruns > 0
+
+
+def test_full_buffer_drops_oldest_samples(load):
+    sampler = Sampler(load, buffer_size=3)
+    samples = list(sampler.stream(count=5))
+
+    assert sampler.dropped == 2
+    assert sampler.read() == samples[2:]
+    assert sampler.read() == []
+
+
+def test_blocking_sampler_waits_for_consumer(load):
+    with Sampler(load, buffer_size=2, block=True) as sampler:
+        deadline = time.monotonic() + 1
+        while len(sampler.buffer) < 2 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        time.sleep(0.02)
+        assert sampler.count == 2
+        assert len(sampler.read()) == 2
+        assert len(sampler.read(max_count=1, timeout=1)) == 1
+        assert sampler.dropped == 0
+    assert not sampler.is_running
@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+from kelctl import *
+
+
+@pytest.fixture
+def threaded_load(sim):
+    with KELSerial(sim, send_sleep_time=0, threaded=True) as load:
+        yield load
+
+
+def test_requests_are_served_by_priority(threaded_load):
+    gate = threading.Event()
+    order = []
+    blocked = threaded_load.submit(lambda load: gate.wait(1))
+
+    futures = [threaded_load.submit(lambda load: order.append("bulk"), priority=PRIORITY_BULK),
+               threaded_load.submit(lambda load: order.append("normal")),
+               threaded_load.submit(lambda load: order.append("high"), priority=PRIORITY_HIGH)]
+    with threaded_load.priority(PRIORITY_HIGH):
+        futures.append(threaded_load.submit(lambda load: order.append("overridden"), priority=PRIORITY_BULK))
+    gate.set()
+
+    assert blocked.result(1) is True
+    for future in futures:
+        future.result(1)
+    assert order == ["high", "overridden", "normal", "bulk"]
+
+
+def test_submit_returns_result_and_exception(threaded_load):
+    threaded_load.current = 1.5
+    assert threaded_load.submit(lambda load: load.current).result(1) == 1.5
+
+    future = threaded_load.submit(setattr, "function", Mode.LIST)
+    assert isinstance(future.exception(1), NoModeSetError)
+
+
+def test_submit_without_worker_runs_right_away(load):
+    future = load.submit(lambda load: load.measured_voltage)
+    assert future.done()
+    assert future.result() == 12.0
+
+
+def test_threads_sharing_a_load_do_not_mix_responses(threaded_load):
+    results = {}
+
+    def poll(name, query, count=20):
+        results[name] = [threaded_load.query(query)[0] for _ in range(count)]
+
+    threads = [threading.Thread(target=poll, args=("voltage", ":MEAS:VOLT?")),
+               threading.Thread(target=poll, args=("function", ":FUNC?")),
+               threading.Thread(target=poll, args=("limit", ":CURR:UPP?"))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {"voltage": [12.0] * 20, "function": [Mode.constant_current] * 20, "limit": [30.0] * 20}
+    assert threaded_load.stats.resyncs == 0
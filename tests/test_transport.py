@@ -0,0 +1,61 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from kelctl import *
+from kelctl import SimulatedKEL103, UDPTransport, ReplayTransport
+
+
+@pytest.fixture
+def udp_load():
+    """ Load answering over UDP a few milliseconds late, commands are written slowly. """
+    device = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    device.bind(("127.0.0.1", 0))
+    sim = SimulatedKEL103()
+
+    def serve():
+        while True:
+            try:
+                data, address = device.recvfrom(4096)
+            except OSError:
+                return
+            sim.write(data)
+            time.sleep(0.003)
+            while sim.in_waiting:
+                device.sendto(sim.readline(), address)
+
+    threading.Thread(target=serve, daemon=True).start()
+    transport = UDPTransport("127.0.0.1", device.getsockname()[1], timeout=0.2, local_port=None)
+    write = transport.write
+
+    def slow_write(data):
+        time.sleep(0.003)
+        return write(data)
+
+    transport.write = slow_write
+    with KELSerial(transport, send_sleep_time=0, timeout=0.2) as load:
+        yield load, transport
+    device.close()
+
+
+def test_udp_batch_keeps_responses_arriving_while_writing(udp_load):
+    load, transport = udp_load
+    assert load.query(":MEAS:VOLT?", ":CURR:UPP?", ":FUNC?", retry=False) == [12.0, 30.0, Mode.constant_current]
+    assert load.stats.resyncs == 0
+    assert load.model == SimulatedKEL103().model
+    assert transport.lost == 0
+
+
+def test_replay_of_a_recording(tmp_path):
+    path = str(tmp_path / "traffic.log")
+    with KELSerial(SimulatedKEL103(), send_sleep_time=0, record=path) as load:
+        load.current = 1.5
+        recorded = [load.current, load.device_info, load.query(":MEAS:VOLT?", ":FUNC?")]
+
+    with KELSerial(ReplayTransport(path, speed=None), send_sleep_time=0) as load:
+        load.current = 1.5
+        assert [load.current, load.device_info, load.query(":MEAS:VOLT?", ":FUNC?")] == recorded
+        with pytest.raises(ReplayMismatchError):
+            load.current = 2